@@ -1,6 +1,7 @@
 import logging
 import os
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Optional
 
 from spark_manager_client import AuthenticatedClient
@@ -16,22 +17,13 @@ from spark_manager_client.models import (
 from spark_manager_client.types import Response
 
 
-@dataclass
-class ClusterDefaults:
-    """Container for default cluster configuration values."""
-
-    worker_count: int = 2
-    worker_cores: int = 1
-    worker_memory: str = "10GiB"
-    master_cores: int = 1
-    master_memory: str = "2GiB"
-
-    # Profile configurations — sized for 10 Spark nodes (168c, 1024G each = 1,680c, 10,240G total)
-    # Medium: 5×(3c,20G) + master(1c,2G) = 16 cores, 102 GiB/user
-    #   100 users → 10,200 GiB (99.6%) RAM, 1,600 cores (95.2%) CPU
-    # Large: 10×(6c,40G) + master(2c,8G) = 62 cores, 408 GiB/user (4× Medium)
-    #   Not all users run Large simultaneously; designed for power-user workloads
-    PROFILES = {
+# Profile configurations — sized for 10 Spark nodes (168c, 1024G each = 1,680c, 10,240G total)
+# Medium: 5×(3c,20G) + master(1c,2G) = 16 cores, 102 GiB/user
+#   100 users → 10,200 GiB (99.6%) RAM, 1,600 cores (95.2%) CPU
+# Large: 10×(6c,40G) + master(2c,8G) = 62 cores, 408 GiB/user (4× Medium)
+#   Not all users run Large simultaneously; designed for power-user workloads
+CLUSTER_PROFILES = MappingProxyType(
+    {
         "medium": {
             "worker_count": 5,
             "worker_cores": 3,
@@ -47,15 +39,66 @@ class ClusterDefaults:
             "master_memory": "8GiB",
         },
     }
+)
+DEFAULT_CLUSTER_PROFILE = "large"
+
+
+@dataclass(frozen=True, slots=True)
+class ClusterDefaults:
+    """Container for default cluster configuration values."""
+
+    worker_count: int = 2
+    worker_cores: int = 1
+    worker_memory: str = "10GiB"
+    master_cores: int = 1
+    master_memory: str = "2GiB"
 
     @classmethod
     def from_profile(cls, profile_slug: str) -> "ClusterDefaults":
-        """Load defaults from a predefined profile."""
-        if profile_slug not in cls.PROFILES:
-            profile_slug = "large"  # fallback to default
+        """Load defaults from a predefined profile, falling back to the default profile."""
+        return _cluster_profile(profile_slug).defaults
+
+
+@dataclass(frozen=True, slots=True)
+class _ClusterProfile:
+    """A predefined cluster profile's defaults, API request body, and notebook environment."""
+
+    defaults: ClusterDefaults
+    spark_config: SparkClusterConfig
+    environment: dict
+
+
+def _build_cluster_profile(config: dict) -> _ClusterProfile:
+    defaults = ClusterDefaults(**config)
+    return _ClusterProfile(
+        defaults=defaults,
+        spark_config=SparkClusterConfig(**config),
+        environment={
+            "SPARK_WORKER_COUNT": str(defaults.worker_count),
+            "SPARK_WORKER_CORES": str(defaults.worker_cores),
+            "SPARK_WORKER_MEMORY": defaults.worker_memory,
+            "SPARK_MASTER_CORES": str(defaults.master_cores),
+            "SPARK_MASTER_MEMORY": defaults.master_memory,
+        },
+    )
+
 
-        profile_config = cls.PROFILES[profile_slug]
-        return cls(**profile_config)
+# The profile set is fixed, so build the (immutable) defaults and API request bodies once rather than per spawn.
+_CLUSTER_PROFILES = {slug: _build_cluster_profile(config) for slug, config in CLUSTER_PROFILES.items()}
+
+
+def _cluster_profile(profile_slug: str) -> _ClusterProfile:
+    """Look up a predefined cluster profile, mapping unknown slugs to the default profile."""
+    return _CLUSTER_PROFILES.get(profile_slug) or _CLUSTER_PROFILES[DEFAULT_CLUSTER_PROFILE]
+
+
+def _format_api_error(response: Response, operation: str) -> str:
+    """Build an error message from a failed API response."""
+    error_message = f"{operation} failed (HTTP {response.status_code})"
+    content = getattr(response, "content", None)
+    if content:
+        error_message += f": {content}"
+    return error_message
 
 
 class SparkClusterError(Exception):
@@ -87,17 +130,29 @@ class SparkClusterManager:
         self.api_url = api_url or os.environ["SPARK_CLUSTER_MANAGER_API_URL"]
         self.logger = logging.getLogger(__name__)
         self.client = AuthenticatedClient(base_url=self.api_url, token=kbase_auth_token)
+        # The generated client only builds its httpx client on first use; aclose must not build one just to close it
+        self._client_used = False
+
+    def _api_client(self) -> AuthenticatedClient:
+        """Return the API client for a request."""
+        self._client_used = True
+        return self.client
+
+    async def aclose(self):
+        """Close the API client's HTTP connection pool, if a request has opened one."""
+        if self._client_used:
+            await self.client.get_async_httpx_client().aclose()
 
     def _get_profile_slug_from_spawner(self, spawner) -> str:
-        """Get the profile slug from spawner. ClusterDefaults.from_profile will handle fallback."""
-        # Get the profile slug from user_options or use 'large' as default
+        """Get the profile slug from spawner. Unknown slugs are mapped to the default profile by _cluster_profile."""
+        # Get the profile slug from user_options or use the default profile
         if spawner.user_options and "profile" in spawner.user_options:
             profile_slug = spawner.user_options["profile"]
-            self.logger.info(f"Using profile from user options: {profile_slug}")
+            self.logger.info("Using profile from user options: %s", profile_slug)
             return profile_slug
 
         self.logger.info("No profile specified in user options, will use default")
-        return "large"
+        return DEFAULT_CLUSTER_PROFILE
 
     async def _raise_api_error(self, response: Response, operation: str):
         """
@@ -110,11 +165,7 @@ class SparkClusterManager:
         Raises:
             SparkClusterError: With API error details
         """
-        error_message = f"{operation} failed (HTTP {response.status_code})"
-
-        if hasattr(response, "content") and response.content:
-            error_message += f": {response.content}"
-
+        error_message = _format_api_error(response, operation)
         self.logger.error(error_message)
         raise SparkClusterError(error_message)
 
@@ -149,15 +200,28 @@ class SparkClusterManager:
             master_cores=master_cores,
             master_memory=master_memory,
         )
+        return await self.create_cluster_from_config(config)
 
-        async with self.client as client:
-            response: Response[SparkClusterCreateResponse] = await create_cluster_clusters_post.asyncio_detailed(
-                client=client, body=config
-            )
+    async def create_cluster_from_config(self, config: SparkClusterConfig) -> SparkClusterCreateResponse:
+        """
+        Create a new Spark cluster from a prepared cluster configuration.
+
+        Args:
+            config: Cluster configuration to send to the API
+
+        Returns:
+            SparkClusterCreateResponse: Cluster creation response with master URL
+
+        Raises:
+            SparkClusterError: If cluster creation fails
+        """
+        response: Response[SparkClusterCreateResponse] = await create_cluster_clusters_post.asyncio_detailed(
+            client=self._api_client(), body=config
+        )
 
         if response.status_code == 201 and response.parsed:
             self.logger.info("Spark cluster created successfully")
-            self.logger.info(f"Master URL: {response.parsed.master_url}")
+            self.logger.info("Master URL: %s", response.parsed.master_url)
             return response.parsed
 
         await self._raise_api_error(response, "Cluster creation")
@@ -183,26 +247,23 @@ class SparkClusterManager:
         username = spawner.user.name
 
         try:
-            self.logger.info(f"Deleting Spark cluster for user {username}")
+            self.logger.info("Deleting Spark cluster for user %s", username)
 
-            async with self.client as client:
-                response: Response[ClusterDeleteResponse] = await delete_cluster_clusters_delete.asyncio_detailed(
-                    client=client
-                )
+            response: Response[ClusterDeleteResponse] = await delete_cluster_clusters_delete.asyncio_detailed(
+                client=self._api_client()
+            )
 
             if response.status_code in (200, 204):
-                self.logger.info(f"Spark cluster deleted successfully for {username}")
+                self.logger.info("Spark cluster deleted successfully for %s", username)
                 return response.parsed
 
             # If not successful, handle error
-            error_message = f"Cluster deletion failed (HTTP {response.status_code})"
-            if hasattr(response, "content") and response.content:
-                error_message += f": {response.content}"
+            error_message = _format_api_error(response, "Cluster deletion")
 
-            self.logger.error(f"Error deleting Spark cluster for user {username}: {error_message}")
+            self.logger.error("Error deleting Spark cluster for user %s: %s", username, error_message)
 
         except Exception as e:
-            self.logger.error(f"Error deleting Spark cluster for user {username}: {str(e)}")
+            self.logger.error("Error deleting Spark cluster for user %s: %s", username, e)
 
     async def start_spark_cluster(self, spawner) -> str:
         """
@@ -223,43 +284,35 @@ class SparkClusterManager:
         try:
             # Get the profile slug from the spawner
             profile_slug = self._get_profile_slug_from_spawner(spawner)
-            self.logger.info(f"Creating Spark cluster for user {username} with profile '{profile_slug}'")
+            self.logger.info("Creating Spark cluster for user %s with profile '%s'", username, profile_slug)
 
             # Get cluster configuration from the profile
-            cluster_config = ClusterDefaults.from_profile(profile_slug)
+            profile = _cluster_profile(profile_slug)
+            cluster_config = profile.defaults
 
             # Create cluster with profile-specific configuration
-            response = await self.create_cluster(
-                worker_count=cluster_config.worker_count,
-                worker_cores=cluster_config.worker_cores,
-                worker_memory=cluster_config.worker_memory,
-                master_cores=cluster_config.master_cores,
-                master_memory=cluster_config.master_memory,
-            )
+            response = await self.create_cluster_from_config(profile.spark_config)
 
             master_url = getattr(response, "master_url", None)
             if not master_url:
                 raise SparkClusterError(f"Master URL not found in response: {response}")
 
-            self.logger.info(f"Spark cluster created with master URL: {master_url}")
+            self.logger.info("Spark cluster created with master URL: %s", master_url)
 
             # Set cluster configuration as environment variables for the notebook
-            spawner.environment["SPARK_MASTER_URL"] = master_url
-            spawner.environment["SPARK_WORKER_COUNT"] = str(cluster_config.worker_count)
-            spawner.environment["SPARK_WORKER_CORES"] = str(cluster_config.worker_cores)
-            spawner.environment["SPARK_WORKER_MEMORY"] = cluster_config.worker_memory
-            spawner.environment["SPARK_MASTER_CORES"] = str(cluster_config.master_cores)
-            spawner.environment["SPARK_MASTER_MEMORY"] = cluster_config.master_memory
+            spawner.environment.update(profile.environment, SPARK_MASTER_URL=master_url)
 
             self.logger.info(
-                f"Set cluster environment variables: "
-                f"workers={cluster_config.worker_count}x{cluster_config.worker_cores}cores/"
-                f"{cluster_config.worker_memory}, "
-                f"master={cluster_config.master_cores}cores/{cluster_config.master_memory}"
+                "Set cluster environment variables: workers=%sx%scores/%s, master=%scores/%s",
+                cluster_config.worker_count,
+                cluster_config.worker_cores,
+                cluster_config.worker_memory,
+                cluster_config.master_cores,
+                cluster_config.master_memory,
             )
 
             return master_url
 
         except Exception as e:
-            self.logger.error(f"Error creating Spark cluster for user {username}: {str(e)}")
+            self.logger.error("Error creating Spark cluster for user %s: %s", username, e)
             raise
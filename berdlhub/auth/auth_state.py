@@ -0,0 +1,6 @@
+"""Hand-off of the decrypted auth state from the authenticator to the spawner hooks."""
+
+# Spawner attribute through which KBaseAuthenticator.pre_spawn_start hands the decrypted auth state to the
+# spawner's hooks (see berdlhub.config.hooks._get_auth_token), so they don't decrypt it again. The hooks
+# remove it on first use.
+AUTH_STATE_SPAWNER_ATTR = "_berdl_auth_state"
@@ -4,10 +4,14 @@ A client for the KBase Auth2 server.
 
 # Mostly copied from https://github.com/kbase/collections
 
+import asyncio
+import hashlib
+import json
 import logging
+import time
 from datetime import datetime, timezone
 from enum import IntEnum
-from typing import NamedTuple, List, Optional
+from typing import Dict, NamedTuple, List, Optional, Tuple
 
 import aiohttp
 from tornado import web
@@ -34,20 +38,14 @@ class KBaseUser(NamedTuple):
     mfa_status: Optional[str] = None
 
 
-async def _get(url, headers):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as r:
-            await _check_error(r)
-            return await r.json()
-
-
 async def _check_error(r):
     if r.status != 200:
+        body = await r.read()
         try:
-            j = await r.json()
+            j = json.loads(body)
         except Exception:
             err = "Non-JSON response from KBase auth server, status code: " + str(r.status)
-            logging.getLogger(__name__).info("%s, response:\n%s", err, await r.text())
+            logging.getLogger(__name__).info("%s, response:\n%s", err, body.decode(errors="replace"))
             raise IOError(err)
         # assume that if we get json then at least this is the auth server and we can
         # rely on the error structure.
@@ -61,23 +59,86 @@ async def _check_error(r):
 class KBaseAuth:
     """A client for contacting the KBase authentication server."""
 
+    # How long a validated token is trusted before the auth server is asked again.
+    _CACHE_TTL_SECONDS = 60
+    _CACHE_MAX_SIZE = 10_000
+
     def __init__(self, auth_url: str, full_admin_roles: List[str], approved_roles: List[str]):
         self._url = auth_url
         self._token_url = self._url + "api/V2/token"
         self._me_url = self._url + "api/V2/me"
-        self._full_roles = set(full_admin_roles) if full_admin_roles else set()
-        self._approved_roles = set(approved_roles) if approved_roles else set()
+        self._full_roles = frozenset(full_admin_roles or ())
+        self._approved_roles = frozenset(approved_roles or ())
+        self._approved_roles_str = ", ".join(sorted(self._approved_roles))
+        self._session: Optional[aiohttp.ClientSession] = None
+        # token hash -> (monotonic expiry time, validated user)
+        self._token_cache: Dict[str, Tuple[float, KBaseUser]] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily since aiohttp sessions must be created inside a running event loop.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=50, ttl_dns_cache=300))
+        return self._session
+
+    async def _get(self, url, headers):
+        async with self._get_session().get(url, headers=headers) as r:
+            await _check_error(r)
+            # json.loads accepts bytes directly, skipping aiohttp's separate text-decode step.
+            return json.loads(await r.read())
 
-    async def validate_token(self, token: str) -> KBaseUser:
+    async def aclose(self):
+        """Close the pooled HTTP session to the KBase auth server, if one was opened."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def validate_token(self, token: str, use_cache: bool = True) -> KBaseUser:
         """
         Validate a token and get user information including expiration and MFA status.
         :param token: The user's token.
+        :param use_cache: whether a recent validation of the token may be returned without contacting
+            the auth server.
         :returns: the user with token expiration and MFA status.
         """
         _not_falsy(token, "token")
 
-        token_data = await _get(self._token_url, {"Authorization": token})
-        me_data = await _get(self._me_url, {"Authorization": token})
+        key = hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+        cached = self._token_cache.get(key)
+        if cached is not None:
+            if use_cache and cached[0] > time.monotonic():
+                return cached[1]
+            del self._token_cache[key]
+
+        try:
+            user = await self._fetch_user(token)
+        except InvalidTokenError:
+            self._token_cache.pop(key, None)
+            raise
+        self._cache_user(key, user)
+        return user
+
+    def _cache_user(self, key: str, user: KBaseUser):
+        now = time.monotonic()
+        ttl = self._CACHE_TTL_SECONDS
+        if user.expires:
+            # Never trust a token past its own expiration.
+            ttl = min(ttl, (user.expires - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return
+        if len(self._token_cache) >= self._CACHE_MAX_SIZE:
+            for k in [k for k, (exp, _) in self._token_cache.items() if exp <= now]:
+                del self._token_cache[k]
+            if len(self._token_cache) >= self._CACHE_MAX_SIZE:
+                # dicts keep insertion order, so this drops the oldest entry
+                del self._token_cache[next(iter(self._token_cache))]
+        self._token_cache[key] = (now + ttl, user)
+
+    async def _fetch_user(self, token: str) -> KBaseUser:
+        # The token and me lookups are independent, so issue them concurrently.
+        headers = {"Authorization": token}
+        token_data, me_data = await asyncio.gather(
+            self._get(self._token_url, headers),
+            self._get(self._me_url, headers),
+        )
 
         expires_ms = token_data.get("expires")
         expires = None
@@ -87,17 +148,16 @@ class KBaseAuth:
         user_roles = set(me_data.get("customroles", []))
 
         # Check if user has an approved role to login
-        if not (user_roles & self._approved_roles):
+        if user_roles.isdisjoint(self._approved_roles):
             logging.info(
                 "User does not have an approved role. User roles: %s, Required roles: %s",
                 user_roles,
                 self._approved_roles,
             )
-            required_roles = ", ".join(sorted(self._approved_roles))
             raise AuthenticationError(
                 status_code=403,
                 log_message=(
-                    f"Access denied. Your account requires one of the following roles: {required_roles}. "
+                    f"Access denied. Your account requires one of the following roles: {self._approved_roles_str}. "
                     "Please contact the KBASE or BERDL administrators for assistance."
                 ),
             )
@@ -111,9 +171,8 @@ class KBaseAuth:
 
         return KBaseUser(UserID(username), admin_perm, token, expires, mfa_status)
 
-    def _get_role(self, roles):
-        r = set(roles)
-        if r & self._full_roles:
+    def _get_role(self, roles: set):
+        if not roles.isdisjoint(self._full_roles):
             return AdminPermission.FULL
         return AdminPermission.NONE
 
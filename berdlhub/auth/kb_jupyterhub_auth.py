@@ -1,17 +1,28 @@
+import asyncio
 import logging
 import os
 from datetime import datetime, timezone
+from functools import cached_property
 
 from jupyterhub.auth import Authenticator
 from jupyterhub.handlers import BaseHandler
 from traitlets import List
 from tornado import web
 
+from berdlhub.auth.auth_state import AUTH_STATE_SPAWNER_ATTR
 from berdlhub.auth.kb_auth import KBaseAuth, MissingTokenError, InvalidTokenError, AdminPermission
 
 logger = logging.getLogger(__name__)
 
 
+async def _close_on_shutdown(kb_auth: KBaseAuth):
+    """Wait for the hub to shut down, then close the auth client's pooled session."""
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await kb_auth.aclose()
+
+
 def kbase_origin():
     """Get the KBase origin from environment variable."""
     return os.environ.get("KBASE_ORIGIN", "narrative.kbase.us")
@@ -44,6 +55,15 @@ class KBaseAuthenticator(Authenticator):
         help="Comma-separated list of KBase roles approved to login to JupyterHub.",
     )
 
+    @cached_property
+    def kb_auth(self) -> KBaseAuth:
+        """KBase auth client shared across logins and refreshes so connections to the auth server are pooled."""
+        kb_auth = KBaseAuth(self.kbase_auth_url, self.auth_full_admin_roles, self.approved_roles)
+        # Authenticators get no shutdown hook, but on shutdown the hub cancels every remaining task and
+        # waits for it before stopping the loop. A task parked until then closes the session.
+        self._kb_auth_closer = asyncio.get_running_loop().create_task(_close_on_shutdown(kb_auth))
+        return kb_auth
+
     async def authenticate(self, handler, data=None) -> dict:
         """
         Authenticate user using KBase session cookie and API validation
@@ -59,19 +79,18 @@ class KBaseAuthenticator(Authenticator):
                 f"Authentication required - missing {self.SESSION_COOKIE_NAME} and {self.SESSION_COOKIE_BACKUP} cookie."
             )
 
-        kb_auth = KBaseAuth(self.kbase_auth_url, self.auth_full_admin_roles, self.approved_roles)
-        kb_user = await kb_auth.validate_token(session_token)
+        kb_user = await self.kb_auth.validate_token(session_token)
 
         # Validate MFA requirement - only allow Used status
         if kb_user.mfa_status != "Used":
-            logger.warning(f"User {kb_user.user} denied access due to MFA status: {kb_user.mfa_status}")
+            logger.warning("User %s denied access due to MFA status: %s", kb_user.user, kb_user.mfa_status)
             # Redirect to MFA requirement page
             mfa_status = kb_user.mfa_status or "Unknown"
             redirect_url = f"/mfa-required?mfa_status={mfa_status}"
             handler.redirect(redirect_url)
             return None
 
-        logger.info(f"Authenticated user: {kb_user.user} with MFA status: {kb_user.mfa_status}")
+        logger.info("Authenticated user: %s with MFA status: %s", kb_user.user, kb_user.mfa_status)
         return {
             "name": str(kb_user.user),
             "admin": kb_user.admin_perm == AdminPermission.FULL,
@@ -93,26 +112,30 @@ class KBaseAuthenticator(Authenticator):
             raise MissingTokenError("Missing KBase authentication token in auth state")
 
         spawner.environment["KBASE_AUTH_TOKEN"] = kbase_auth_token
+        # Hand the decrypted auth state to the spawner's pre-spawn hook, which runs next in the same spawn
+        setattr(spawner, AUTH_STATE_SPAWNER_ATTR, auth_state)
 
-    async def refresh_user(self, user, handler, **kwargs):
+    async def refresh_user(self, user, handler, force=False, **kwargs):
         """
         Refresh user authentication by validating token against KBase auth2/token endpoint.
         This is called periodically to ensure tokens are still valid.
+
+        JupyterHub limits how often this runs with auth_refresh_age. Unless force is set, the auth
+        client's short-lived token cache may answer instead of KBase.
         """
         auth_state = await user.get_auth_state() or {}
         kbase_token = auth_state.get("kbase_token")
 
         if not kbase_token:
-            logger.warning(f"No token found for user {user.name} during refresh")
+            logger.warning("No token found for user %s during refresh", user.name)
             return False
 
         try:
-            kb_auth = KBaseAuth(self.kbase_auth_url, self.auth_full_admin_roles, self.approved_roles)
-            kb_user = await kb_auth.validate_token(kbase_token)
+            kb_user = await self.kb_auth.validate_token(kbase_token, use_cache=not force)
 
             # Check MFA status - if not Used, invalidate the session
             if kb_user.mfa_status != "Used":
-                logger.warning(f"Token refresh failed for user {user.name}: MFA status is {kb_user.mfa_status}")
+                logger.warning("Token refresh failed for user %s: MFA status is %s", user.name, kb_user.mfa_status)
                 return False
 
             # Update auth_state with fresh token information
@@ -127,14 +150,14 @@ class KBaseAuthenticator(Authenticator):
             user.db.auth_state = auth_state
             self.db.commit()
 
-            logger.info(f"Successfully refreshed token for user {user.name} with MFA status: {kb_user.mfa_status}")
+            logger.info("Successfully refreshed token for user %s with MFA status: %s", user.name, kb_user.mfa_status)
             return True
 
         except (InvalidTokenError, MissingTokenError) as e:
-            logger.warning(f"Token validation failed for user {user.name}: {e}")
+            logger.warning("Token validation failed for user %s: %s", user.name, e)
             return False
         except Exception as e:
-            logger.error(f"Unexpected error during token refresh for user {user.name}: {e}")
+            logger.error("Unexpected error during token refresh for user %s: %s", user.name, e)
             return False
 
 
@@ -153,7 +176,7 @@ class TokenRefreshHandler(BaseHandler):
             authenticator = self.authenticator
 
             # Use the authenticator's refresh_user method
-            success = await authenticator.refresh_user(user, self)
+            success = await authenticator.refresh_user(user, self, force=True)
 
             if success:
                 # Get updated auth state
@@ -178,7 +201,7 @@ class TokenRefreshHandler(BaseHandler):
                 self.write({"success": False, "error": "Token refresh failed - please log in again"})
 
         except Exception as e:
-            logger.error(f"Error refreshing token: {e}")
+            logger.error("Error refreshing token: %s", e)
             raise web.HTTPError(500, "Internal server error refreshing token")
 
 
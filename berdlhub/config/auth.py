@@ -12,10 +12,10 @@ def configure_auth(c):
     # Token refresh configuration for KBase authentication
     # This controls how often JupyterHub calls the authenticator's refresh_user() method
     # to validate tokens against the KBase auth2/token endpoint.
-    # Set to 120 seconds (2 minutes) to provide timely detection of token expiration
-    # while balancing API call frequency to the KBase auth service.
+    # Set to 600 seconds (10 minutes); KBase tokens live far longer than that, so checking more often
+    # mostly adds load on the KBase auth service.
     # ref: https://jupyterhub.readthedocs.io/en/stable/reference/config-reference.html#Authenticator.auth_refresh_age
-    c.Authenticator.auth_refresh_age = 120
+    c.Authenticator.auth_refresh_age = 600
 
     # Add custom API handlers for token monitoring and MFA requirement
     c.JupyterHub.extra_handlers = [
@@ -1,19 +1,71 @@
+import asyncio
 import json
+import logging
 import os
+import re
+from functools import partial
 
 from kubernetes import client
 
 from berdlhub.api_utils.spark_utils import SparkClusterManager
+from berdlhub.auth.auth_state import AUTH_STATE_SPAWNER_ATTR
 from berdlhub.config.spark_connect_service import (
     create_user_notebook_service,
     delete_user_notebook_service,
     ensure_pod_labels_for_service,
 )
 
+# kubespawner treats environment values as Python format strings, so literal braces must be doubled.
+_BRACE_ESCAPE = str.maketrans({"{": "{{", "}": "}}"})
+
+logger = logging.getLogger(__name__)
+
+# key=value:effect - the key stops at the first '=', the value at the first ':'
+_TOLERATION_RE = re.compile(r"([^=:]*)=([^:]*):(.*)")
+
+# Post-stop teardown runs in the background so stopping a server does not wait on the Spark manager.
+# The semaphore keeps a mass logout from flooding the Spark manager, and the per-user tasks let a
+# respawn wait for its previous teardown so it doesn't delete the newly created cluster. A teardown
+# still pending at hub shutdown is finished before the hub exits (see _teardown_user_resources).
+_TEARDOWN_SEMAPHORE = asyncio.Semaphore(16)
+_teardown_tasks: dict[str, asyncio.Task] = {}
+
+# Spark Connect Service creation runs in the background too; teardown waits for it so a quick stop
+# cannot delete the Service before it has been created.
+_service_tasks: dict[str, asyncio.Task] = {}
+
+
+def _field_env(name: str, field_path: str) -> client.V1EnvVar:
+    return client.V1EnvVar(
+        name, None, client.V1EnvVarSource(field_ref=client.V1ObjectFieldSelector(field_path=field_path))
+    )
+
+
+def _resource_env(name: str, resource: str) -> client.V1EnvVar:
+    return client.V1EnvVar(
+        name, None, client.V1EnvVarSource(resource_field_ref=client.V1ResourceFieldSelector(resource=resource))
+    )
+
+
+# Downward API variables exposed to every notebook pod. They are identical for all pods and only ever
+# read when the pod manifest is serialized, so they are built once and shared.
+_BERDL_POD_ENV = (
+    _field_env("BERDL_POD_IP", "status.podIP"),
+    _field_env("BERDL_POD_NAME", "metadata.name"),
+    _resource_env("BERDL_CPU_REQUEST", "requests.cpu"),
+    _resource_env("BERDL_CPU_LIMIT", "limits.cpu"),
+    _resource_env("BERDL_MEMORY_REQUEST", "requests.memory"),
+    _resource_env("BERDL_MEMORY_LIMIT", "limits.memory"),
+)
+
 
 async def _get_auth_token(spawner) -> str:
     """Helper method to retrieve and validate the auth token from the user's auth_state."""
-    auth_state = await spawner.user.get_auth_state()
+    # Reuse the auth state the authenticator's pre_spawn_start already decrypted for this spawn, if any.
+    # It is popped so a later hook never sees a stale copy.
+    auth_state = vars(spawner).pop(AUTH_STATE_SPAWNER_ATTR, None)
+    if auth_state is None:
+        auth_state = await spawner.user.get_auth_state()
     if not auth_state:
         spawner.log.error("KBase auth_state not found for user.")
         raise RuntimeError("KBase authentication state is missing.")
@@ -32,32 +84,45 @@ def _get_profile_environment(spawner) -> dict:
     if not profile_list:
         return {}
 
-    selected_profile = None
-    profile_slug = None
+    # Treat a missing or empty selection the same, so both share the default profile's cache entry
+    profile_slug = (spawner.user_options or {}).get("profile") or None
+
+    # The same spawner resolves the same profile on every start and stop, so remember the result per slug.
+    # The cache lives on the spawner because each spawner holds its own copy of profile_list.
+    cache = vars(spawner).setdefault("_berdl_profile_cache", {})
+    if profile_slug not in cache:
+        cache[profile_slug] = _resolve_profile(spawner, profile_list, profile_slug)
+    profile_json, profile_environment = cache[profile_slug]
+
+    spawner.environment["BERDL_PROFILE_JSON"] = profile_json
+    return profile_environment
+
 
-    # Get the profile slug from user_options
-    if spawner.user_options and "profile" in spawner.user_options:
-        profile_slug = spawner.user_options["profile"]
+def _resolve_profile(spawner, profile_list: list, profile_slug: str | None) -> tuple[str, dict]:
+    """Find the selected profile and return its escaped BERDL_PROFILE_JSON value and environment."""
+    selected_profile = None
 
+    # Without a selection there is nothing to match; go straight to the default profile
+    if profile_slug is not None:
         # Find the profile by matching the explicit slug
         for profile in profile_list:
             explicit_slug = profile.get("slug")
             if explicit_slug and explicit_slug == profile_slug:
                 selected_profile = profile
-                spawner.log.info(f"Profile matched by slug: {explicit_slug}")
+                spawner.log.info("Profile matched by slug: %s", explicit_slug)
                 break
 
         # Log if no matching profile found
         if selected_profile is None:
             available_slugs = [p.get("slug") for p in profile_list]
-            spawner.log.info(f"No profile found with slug '{profile_slug}'. Available profiles: {available_slugs}")
+            spawner.log.info("No profile found with slug '%s'. Available profiles: %s", profile_slug, available_slugs)
 
     # Default to first profile if no match found
     if selected_profile is None:
         selected_profile = profile_list[0]
-        spawner.log.info(f"Using default profile: {selected_profile.get('display_name')}")
+        spawner.log.info("Using default profile: %s", selected_profile.get("display_name"))
 
-    # Set BERDL_PROFILE_JSON for the JupyterLab profile widget
+    # BERDL_PROFILE_JSON feeds the JupyterLab profile widget
     # Note: Curly braces must be escaped (doubled) because kubespawner treats
     # environment values as Python format strings and expands {placeholders}
     profile_info = {
@@ -65,13 +130,12 @@ def _get_profile_environment(spawner) -> dict:
         "display_name": selected_profile.get("display_name"),
         "description": selected_profile.get("description"),
     }
-    profile_json = json.dumps(profile_info)
-    spawner.environment["BERDL_PROFILE_JSON"] = profile_json.replace("{", "{{").replace("}", "}}")
+    profile_json = json.dumps(profile_info).translate(_BRACE_ESCAPE)
 
     kubespawner_override = selected_profile.get("kubespawner_override", {})
     profile_environment = kubespawner_override.get("environment", {})
 
-    return profile_environment
+    return profile_json, profile_environment
 
 
 async def pre_spawn_hook(spawner):
@@ -80,41 +144,114 @@ async def pre_spawn_hook(spawner):
     """
     spawner.log.debug("Pre-spawn hook called for user %s", spawner.user.name)
     kb_auth_token = await _get_auth_token(spawner)
-    if os.environ["BERDL_SKIP_SPAWN_HOOKS"].lower() == "true":
+    if _SKIP_SPAWN_HOOKS:
         spawner.log.info("Skipping pre-spawn hook due to BERDL_SKIP_SPAWN_HOOKS environment variable.")
         return
 
+    pending_teardown = _teardown_tasks.get(spawner.user.name)
+    if pending_teardown is not None:
+        spawner.log.info("Waiting for previous teardown to finish for user %s", spawner.user.name)
+        # asyncio.wait does not cancel the teardown if this hook is cancelled
+        await asyncio.wait({pending_teardown})
+
     # Get profile-specific environment from selected profile
     profile_env = _get_profile_environment(spawner)
     spawner.environment.update(profile_env)
 
-    # Note: SparkClusterManager now handles cluster configuration internally via profile detection
-    await SparkClusterManager(kb_auth_token).start_spark_cluster(spawner)
-
     # Create Kubernetes Service for Spark Connect access
     # This allows external pods (like datalake-mcp-server) to connect to the user's
     # Spark Connect server via DNS: sc://jupyter-{username}.{namespace}:15002
+    # The Service selector binds to the pod whenever it appears and nothing in the spawn needs the
+    # Service, so it is created in the background (in a thread, as the Kubernetes client is blocking).
     spawner.log.info("Creating Kubernetes Service for Spark Connect access")
-    create_user_notebook_service(spawner)
+    _track_task(_service_tasks, spawner.user.name, asyncio.to_thread(create_user_notebook_service, spawner))
+
+    await _start_spark_cluster(kb_auth_token, spawner)
+
+
+async def _start_spark_cluster(kb_auth_token: str, spawner):
+    # Note: SparkClusterManager now handles cluster configuration internally via profile detection
+    spark_manager = SparkClusterManager(kb_auth_token)
+    try:
+        await spark_manager.start_spark_cluster(spawner)
+    finally:
+        await spark_manager.aclose()
 
 
 async def post_stop_hook(spawner):
     """
     Hook to delete the Spark cluster and Kubernetes Service after the user's server stops.
+
+    The deletion runs as a background task so the stop is not held up by the Spark manager.
     """
+    # A spawn that fails between pre_spawn_start and pre_spawn_hook is stopped, so this also drops the
+    # auth state handed to the spawner for it.
     kb_auth_token = await _get_auth_token(spawner)
     spawner.log.debug("Post-stop hook called for user %s", spawner.user.name)
-    if os.environ["BERDL_SKIP_SPAWN_HOOKS"].lower() == "true":
+    if _SKIP_SPAWN_HOOKS:
         spawner.log.info("Skipping post-stop hook due to BERDL_SKIP_SPAWN_HOOKS environment variable.")
         return
     # Get profile-specific environment for consistency
     profile_env = _get_profile_environment(spawner)
     spawner.environment.update(profile_env)
-    await SparkClusterManager(kb_auth_token).stop_spark_cluster(spawner)
 
-    # Delete Kubernetes Service
-    spawner.log.info("Deleting Kubernetes Service for Spark Connect")
-    delete_user_notebook_service(spawner)
+    _track_task(_teardown_tasks, spawner.user.name, _teardown_user_resources(kb_auth_token, spawner))
+
+
+def _track_task(tasks: dict[str, asyncio.Task], username: str, coro) -> asyncio.Task:
+    """Run coro as a background task, keeping a reference to it under username until it finishes."""
+    task = asyncio.create_task(coro)
+    tasks[username] = task
+    task.add_done_callback(partial(_forget_task, tasks, username))
+    return task
+
+
+def _forget_task(tasks: dict[str, asyncio.Task], username: str, task: asyncio.Task):
+    # A newer task for the same user may have replaced this one
+    if tasks.get(username) is task:
+        del tasks[username]
+
+
+async def _teardown_user_resources(kb_auth_token: str, spawner):
+    """Delete the user's Spark cluster and Kubernetes Service. Errors are logged, not raised."""
+    deletion = asyncio.create_task(_delete_user_resources(kb_auth_token, spawner))
+    try:
+        await asyncio.shield(deletion)
+    except asyncio.CancelledError:
+        # Nothing else cancels teardown tasks: on shutdown the hub stops every server, then cancels all
+        # remaining tasks and waits for them before stopping the loop. Let the deletion finish so the
+        # user's Spark cluster is not orphaned, then let the cancellation through.
+        await asyncio.wait({deletion})
+        raise
+
+
+async def _delete_user_resources(kb_auth_token: str, spawner):
+    cluster_deleted = False
+    while True:
+        try:
+            async with _TEARDOWN_SEMAPHORE:
+                if not cluster_deleted:
+                    spark_manager = SparkClusterManager(kb_auth_token)
+                    try:
+                        await spark_manager.stop_spark_cluster(spawner)
+                        cluster_deleted = True
+                    finally:
+                        await spark_manager.aclose()
+
+                # Delete Kubernetes Service, once any pending creation has finished
+                pending_service = _service_tasks.get(spawner.user.name)
+                if pending_service is not None:
+                    await asyncio.wait({pending_service})
+                spawner.log.info("Deleting Kubernetes Service for Spark Connect")
+                delete_user_notebook_service(spawner)
+            return
+        except asyncio.CancelledError:
+            # Hub shutdown cancels this task too, not just the teardown awaiting it. Carry on from the
+            # interrupted step rather than abandon the deletion or repeat the steps already done.
+            spawner.log.info("Hub shutting down, finishing teardown for user %s", spawner.user.name)
+        except Exception:
+            spawner.log.exception("Error tearing down resources for user %s", spawner.user.name)
+            return
 
 
 def modify_pod_hook(spawner, pod):
@@ -122,60 +259,16 @@ def modify_pod_hook(spawner, pod):
     # This must be done BEFORE the Service is created in pre_spawn_hook
     pod = ensure_pod_labels_for_service(spawner, pod)
 
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_POD_IP",
-            None,
-            client.V1EnvVarSource(field_ref=client.V1ObjectFieldSelector(field_path="status.podIP")),
-        )
-    )
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_POD_NAME",
-            None,
-            client.V1EnvVarSource(field_ref=client.V1ObjectFieldSelector(field_path="metadata.name")),
-        )
-    )
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_CPU_REQUEST",
-            None,
-            client.V1EnvVarSource(resource_field_ref=client.V1ResourceFieldSelector(resource="requests.cpu")),
-        )
-    )
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_CPU_LIMIT",
-            None,
-            client.V1EnvVarSource(resource_field_ref=client.V1ResourceFieldSelector(resource="limits.cpu")),
-        )
-    )
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_MEMORY_REQUEST",
-            None,
-            client.V1EnvVarSource(resource_field_ref=client.V1ResourceFieldSelector(resource="requests.memory")),
-        )
-    )
-    pod.spec.containers[0].env.append(
-        client.V1EnvVar(
-            "BERDL_MEMORY_LIMIT",
-            None,
-            client.V1EnvVarSource(resource_field_ref=client.V1ResourceFieldSelector(resource="limits.memory")),
-        )
-    )
+    pod.spec.containers[0].env.extend(_BERDL_POD_ENV)
 
     # Add tolerations if specified
-    tolerations_env = os.environ.get("BERDL_TOLERATIONS")
-    if tolerations_env:
-        tolerations = parse_tolerations_from_env(tolerations_env, spawner)
-        if tolerations:
-            pod.spec.tolerations = tolerations
+    if _BERDL_TOLERATIONS:
+        pod.spec.tolerations = list(_BERDL_TOLERATIONS)
 
     return pod
 
 
-def parse_tolerations_from_env(tolerations_env: str, spawner) -> list[client.V1Toleration]:
+def parse_tolerations_from_env(tolerations_env: str, log: logging.Logger) -> list[client.V1Toleration]:
     """
     Parse tolerations from a comma-separated environment variable string.
     Each toleration should be in the format: key=value:effect
@@ -187,18 +280,21 @@ def parse_tolerations_from_env(tolerations_env: str, spawner) -> list[client.V1T
         if not toleration_str:
             continue
 
-        try:
-            if ":" not in toleration_str or "=" not in toleration_str:
-                raise ValueError("Missing ':' or '=' in toleration format")
-
-            key_value, effect = toleration_str.split(":", 1)
-            key, value = key_value.split("=", 1)
-            tolerations.append(client.V1Toleration(key=key, operator="Equal", value=value, effect=effect))
-        except ValueError:
-            spawner.log.warning(f"Invalid toleration format: {toleration_str}. Expected format: key=value:effect")
+        match = _TOLERATION_RE.fullmatch(toleration_str)
+        if match is None:
+            log.warning("Invalid toleration format: %s. Expected format: key=value:effect", toleration_str)
+            continue
+
+        key, value, effect = match.groups()
+        tolerations.append(client.V1Toleration(key=key, operator="Equal", value=value, effect=effect))
     return tolerations
 
 
+# Hook settings are fixed for the life of the hub process, so read and parse them once at import.
+_SKIP_SPAWN_HOOKS = os.environ.get("BERDL_SKIP_SPAWN_HOOKS", "false").lower() == "true"
+_BERDL_TOLERATIONS = tuple(parse_tolerations_from_env(os.environ.get("BERDL_TOLERATIONS", ""), logger))
+
+
 def configure_hooks(c):
     c.KubeSpawner.pre_spawn_hook = pre_spawn_hook
     c.KubeSpawner.post_stop_hook = post_stop_hook
@@ -2,34 +2,37 @@
 
 import os
 
+# (slug, display name, description) for each profile, in the order shown to users.
+# Profiles differ only in the size of the Spark cluster created for them
+# (see berdlhub.api_utils.spark_utils.CLUSTER_PROFILES); the notebook pod itself is the same.
+PROFILE_SPECS = (
+    ("medium", "Medium", "Balanced Spark cluster for medium data processing workloads"),
+    ("large", "Large", "High-performance Spark cluster for large datasets and heavy computation"),
+)
+DEFAULT_PROFILE = "medium"
+
+NOTEBOOK_RESOURCES = {
+    "mem_limit": "24G",
+    "mem_guarantee": "6G",
+    "cpu_guarantee": 1,
+}
+
 
 def configure_profiles(c):
     """Configure server profile options."""
 
     berdl_image = os.environ["BERDL_NOTEBOOK_IMAGE_TAG"]
 
-    c.KubeSpawner.profile_list = [
-        {
-            "display_name": ("Medium"),
-            "description": "Balanced Spark cluster for medium data processing workloads",
-            "slug": "medium",
-            "default": True,
-            "kubespawner_override": {
-                "mem_limit": "24G",
-                "mem_guarantee": "6G",
-                "cpu_guarantee": 1,
-                "image": berdl_image,
-            },
-        },
-        {
-            "display_name": ("Large"),
-            "description": "High-performance Spark cluster for large datasets and heavy computation",
-            "slug": "large",
-            "kubespawner_override": {
-                "mem_limit": "24G",
-                "mem_guarantee": "6G",
-                "cpu_guarantee": 1,
-                "image": berdl_image,
-            },
-        },
-    ]
+    profile_list = []
+    for slug, display_name, description in PROFILE_SPECS:
+        profile = {
+            "display_name": display_name,
+            "description": description,
+            "slug": slug,
+        }
+        if slug == DEFAULT_PROFILE:
+            profile["default"] = True
+        profile["kubespawner_override"] = {**NOTEBOOK_RESOURCES, "image": berdl_image}
+        profile_list.append(profile)
+
+    c.KubeSpawner.profile_list = profile_list
@@ -9,9 +9,47 @@ as hooks.py will wrap these service management functions.
 """
 
 import re
-from kubernetes import client, config
+from functools import lru_cache
 
+from kubernetes import client, config
 
+_INVALID_K8S_NAME_CHARS = re.compile(r"[^a-z0-9.-]")
+_REPEATED_HYPHENS = re.compile(r"-+")
+
+# Labels shared by every user notebook pod and used to select it from its Service;
+# the per-user _USERNAME_LABEL is added alongside them.
+_NOTEBOOK_POD_LABELS = {
+    "app": "berdl-notebook",
+    "component": "singleuser-server",
+}
+_USERNAME_LABEL = "hub.jupyter.org/username"
+# Labels the Service object carries on top of its selector labels
+_SERVICE_ONLY_LABELS = {"app.kubernetes.io/managed-by": "jupyterhub"}
+
+# Field manager recorded for server-side apply of the notebook Services
+_FIELD_MANAGER = "berdl-jupyterhub"
+
+# Ports exposed by every user notebook Service. They never vary and the client only reads them when
+# serializing the request, so one list is shared by all Services.
+_SERVICE_PORTS = [
+    # JupyterLab port
+    client.V1ServicePort(
+        name="notebook",
+        port=8888,
+        target_port=8888,
+        protocol="TCP",
+    ),
+    # Spark Connect port
+    client.V1ServicePort(
+        name="spark-connect",
+        port=15002,
+        target_port=15002,
+        protocol="TCP",
+    ),
+]
+
+
+@lru_cache(maxsize=1024)
 def sanitize_k8s_name(name: str) -> str:
     """
     Sanitize a string to be Kubernetes DNS-1123 subdomain compliant.
@@ -28,19 +66,51 @@ def sanitize_k8s_name(name: str) -> str:
         A DNS-1123 compliant string (replaces underscores with hyphens)
     """
     # Replace underscores and other invalid characters with hyphens
-    sanitized = re.sub(r"[^a-z0-9.-]", "-", name.lower())
+    sanitized = _INVALID_K8S_NAME_CHARS.sub("-", name.lower())
 
-    # Ensure it starts and ends with alphanumeric
-    sanitized = re.sub(r"^[^a-z0-9]+", "", sanitized)
-    sanitized = re.sub(r"[^a-z0-9]+$", "", sanitized)
+    # Ensure it starts and ends with alphanumeric ('.' and '-' are the only other characters left)
+    sanitized = sanitized.strip(".-")
 
     # Collapse multiple consecutive hyphens
-    sanitized = re.sub(r"-+", "-", sanitized)
+    sanitized = _REPEATED_HYPHENS.sub("-", sanitized)
 
     # Truncate to 253 characters (K8s limit)
     return sanitized[:253]
 
 
+@lru_cache(maxsize=1)
+def _core_v1_api() -> client.CoreV1Api:
+    """Load the in-cluster config and build the CoreV1Api client once, on first use."""
+    config.load_incluster_config()
+    return client.CoreV1Api()
+
+
+def _service_name(username: str) -> str:
+    """Name of the user's notebook Service."""
+    # Sanitize username for Kubernetes DNS-1123 compliance (replace underscores with hyphens)
+    return f"jupyter-{sanitize_k8s_name(username)}"
+
+
+def _apply_service(v1: client.CoreV1Api, service: client.V1Service) -> client.V1Service:
+    """
+    Create or update a Service with a single server-side apply PATCH.
+
+    The generated patch_namespaced_service cannot select the apply-patch content type, so the
+    request is issued through the API client directly.
+    """
+    return v1.api_client.call_api(
+        "/api/v1/namespaces/{namespace}/services/{name}",
+        "PATCH",
+        path_params={"namespace": service.metadata.namespace, "name": service.metadata.name},
+        query_params=[("fieldManager", _FIELD_MANAGER), ("force", "true")],
+        header_params={"Accept": "application/json", "Content-Type": "application/apply-patch+yaml"},
+        body=service,
+        response_type="V1Service",
+        auth_settings=["BearerToken"],
+        _return_http_data_only=True,
+    )
+
+
 def create_user_notebook_service(spawner):
     """
     Create a Kubernetes Service for the user's notebook pod.
@@ -58,16 +128,10 @@ def create_user_notebook_service(spawner):
     """
     username = spawner.user.name
     namespace = spawner.namespace
-    # Sanitize username for Kubernetes DNS-1123 compliance (replace underscores with hyphens)
-    sanitized_username = sanitize_k8s_name(username)
-    service_name = f"jupyter-{sanitized_username}"
+    service_name = _service_name(username)
 
     # Match the labels on the pod created by KubeSpawner
-    selector_labels = {
-        "app": "berdl-notebook",
-        "component": "singleuser-server",
-        "hub.jupyter.org/username": username,
-    }
+    selector_labels = {**_NOTEBOOK_POD_LABELS, _USERNAME_LABEL: username}
 
     service = client.V1Service(
         api_version="v1",
@@ -75,10 +139,7 @@ def create_user_notebook_service(spawner):
         metadata=client.V1ObjectMeta(
             name=service_name,
             namespace=namespace,
-            labels={
-                **selector_labels,
-                "app.kubernetes.io/managed-by": "jupyterhub",
-            },
+            labels=selector_labels | _SERVICE_ONLY_LABELS,
             annotations={
                 "description": f"Service for {username}'s notebook and Spark Connect server",
             },
@@ -86,47 +147,18 @@ def create_user_notebook_service(spawner):
         spec=client.V1ServiceSpec(
             type="ClusterIP",
             selector=selector_labels,
-            ports=[
-                # JupyterLab port
-                client.V1ServicePort(
-                    name="notebook",
-                    port=8888,
-                    target_port=8888,
-                    protocol="TCP",
-                ),
-                # Spark Connect port
-                client.V1ServicePort(
-                    name="spark-connect",
-                    port=15002,
-                    target_port=15002,
-                    protocol="TCP",
-                ),
-            ],
+            ports=_SERVICE_PORTS,
         ),
     )
 
-    # Create or update the service using Kubernetes API
+    # Create or update the service in a single server-side apply request
     try:
-        config.load_incluster_config()
-        v1 = client.CoreV1Api()
-
-        # Try to get existing service
-        try:
-            v1.read_namespaced_service(name=service_name, namespace=namespace)
-            # Service exists, patch it
-            v1.patch_namespaced_service(name=service_name, namespace=namespace, body=service)
-            spawner.log.info(f"✅ Updated Service {service_name}.{namespace}")
-        except client.exceptions.ApiException as e:
-            if e.status == 404:
-                # Service doesn't exist, create it
-                v1.create_namespaced_service(namespace=namespace, body=service)
-                spawner.log.info(f"✅ Created Service {service_name}.{namespace}")
-                spawner.log.info(f"   - Jupyter: http://{service_name}.{namespace}:8888")
-                spawner.log.info(f"   - Spark Connect: sc://{service_name}.{namespace}:15002")
-            else:
-                raise
+        _apply_service(_core_v1_api(), service)
+        spawner.log.info("✅ Applied Service %s.%s", service_name, namespace)
+        spawner.log.info("   - Jupyter: http://%s.%s:8888", service_name, namespace)
+        spawner.log.info("   - Spark Connect: sc://%s.%s:15002", service_name, namespace)
     except Exception as e:
-        spawner.log.error(f"❌ Failed to create/update Service {service_name}: {e}")
+        spawner.log.error("❌ Failed to create/update Service %s: %s", service_name, e)
         # Don't fail pod creation if service creation fails
 
 
@@ -140,24 +172,20 @@ def delete_user_notebook_service(spawner):
     Returns:
         None (deletes service via Kubernetes API)
     """
-    username = spawner.user.name
-    # Sanitize username for Kubernetes DNS-1123 compliance (replace underscores with hyphens)
-    sanitized_username = sanitize_k8s_name(username)
-    service_name = f"jupyter-{sanitized_username}"
+    service_name = _service_name(spawner.user.name)
 
     try:
-        config.load_incluster_config()
-        v1 = client.CoreV1Api()
+        v1 = _core_v1_api()
 
         v1.delete_namespaced_service(name=service_name, namespace=spawner.namespace)
-        spawner.log.info(f"🗑️  Deleted Service {service_name}")
+        spawner.log.info("🗑️  Deleted Service %s", service_name)
     except client.exceptions.ApiException as e:
         if e.status == 404:
-            spawner.log.info(f"Service {service_name} already deleted")
+            spawner.log.info("Service %s already deleted", service_name)
         else:
-            spawner.log.error(f"Failed to delete Service {service_name}: {e}")
+            spawner.log.error("Failed to delete Service %s: %s", service_name, e)
     except Exception as e:
-        spawner.log.error(f"Unexpected error deleting Service: {e}")
+        spawner.log.error("Unexpected error deleting Service: %s", e)
 
 
 def ensure_pod_labels_for_service(spawner, pod):
@@ -176,12 +204,7 @@ def ensure_pod_labels_for_service(spawner, pod):
     if not pod.metadata.labels:
         pod.metadata.labels = {}
 
-    pod.metadata.labels.update(
-        {
-            "app": "berdl-notebook",
-            "component": "singleuser-server",
-            "hub.jupyter.org/username": username,
-        }
-    )
+    pod.metadata.labels.update(_NOTEBOOK_POD_LABELS)
+    pod.metadata.labels[_USERNAME_LABEL] = username
 
     return pod
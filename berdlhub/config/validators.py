@@ -6,53 +6,54 @@ import sys
 
 logger = logging.getLogger(__name__)
 
+# Environment variable name -> description, listed when the variable is missing
+REQUIRED_ENV_VARS = {
+    # Core JupyterHub
+    "JUPYTERHUB_COOKIE_SECRET_64_HEX_CHARS": "64 character hex string for cookies",
+    "JUPYTERHUB_TEMPLATES_DIR": "Path to JupyterHub templates",
+    # KBase integration
+    "KBASE_ORIGIN": "KBase origin URL",
+    "KBASE_AUTH_URL": "KBase authentication service URL",
+    # Services
+    "CDM_TASK_SERVICE_URL": "CDM task service endpoint",
+    "GOVERNANCE_API_URL": "Governance API endpoint",
+    "MINIO_ENDPOINT_URL": "MinIO endpoint URL for the governance service to inject into the users env",
+    "SPARK_CLUSTER_MANAGER_API_URL": "Spark cluster manager API",
+    "BERDL_HIVE_METASTORE_URI": "Hive metastore URI",
+    "BERDL_NOTEBOOK_IMAGE_TAG": "Docker image tag for the notebook server",
+    "BERDL_SKIP_SPAWN_HOOKS": "Skip pre and post spawn hooks. Useful for local dev.",
+    # Storage configuration
+    "BERDL_NOTEBOOK_HOMES_DIR": "Base path for hub storage (e.g., /mnt/state/dev/hub, /mnt/state/prod/hub)",
+}
 
-def validate_environment():
-    """Validate that all required environment variables are set."""
-
-    required_vars = {
-        # Core JupyterHub
-        "JUPYTERHUB_COOKIE_SECRET_64_HEX_CHARS": "64 character hex string for cookies",
-        "JUPYTERHUB_TEMPLATES_DIR": "Path to JupyterHub templates",
-        # KBase integration
-        "KBASE_ORIGIN": "KBase origin URL",
-        "KBASE_AUTH_URL": "KBase authentication service URL",
-        # Services
-        "CDM_TASK_SERVICE_URL": "CDM task service endpoint",
-        "GOVERNANCE_API_URL": "Governance API endpoint",
-        "MINIO_ENDPOINT_URL": "MinIO endpoint URL for the governance service to inject into the users env",
-        "SPARK_CLUSTER_MANAGER_API_URL": "Spark cluster manager API",
-        "BERDL_HIVE_METASTORE_URI": "Hive metastore URI",
-        "BERDL_NOTEBOOK_IMAGE_TAG": "Docker image tag for the notebook server",
-        "BERDL_SKIP_SPAWN_HOOKS": "Skip pre and post spawn hooks. Useful for local dev.",
-        # Storage configuration
-        "BERDL_NOTEBOOK_HOMES_DIR": "Base path for hub storage (e.g., /mnt/state/dev/hub, /mnt/state/prod/hub)",
-    }
+# Environment variable name -> description, reported as set or not set at startup
+OPTIONAL_ENV_VARS = {
+    "NODE_SELECTOR_HOSTNAME": "Kubernetes node hostname",
+    "JUPYTERHUB_DEBUG": "Enable debug mode",
+    "JUPYTERHUB_LOG_LEVEL": "Set JupyterHub log level. Default is INFO",
+    "DEFAULT_MASTER_CORES": "Default master cores for Spark clusters",
+    "DEFAULT_MASTER_MEMORY": "Default master memory for Spark clusters",
+    "DEFAULT_WORKER_COUNT": "Default number of worker nodes for Spark clusters",
+    "DEFAULT_WORKER_CORES": "Default worker cores for Spark clusters",
+    "DEFAULT_WORKER_MEMORY": "Default worker memory for Spark clusters",
+    "MINIO_SECURE_FLAG": "Flag indicating if MinIO uses HTTPS to inject into the users env. Defaults to True",
+    "ENABLE_IDLE_CULLER": "Enable idle culler for JupyterHub. Defaults to True",
+    "JUPYTERHUB_IDLE_TIMEOUT_SECONDS": "Idle Culler timeout seconds. Defaults to 3600 seconds (1 hour)",
+    "JUPYTERHUB_MEM_LIMIT_GB": "Memory limit in GB for JupyterHub users. Defaults to 4GB",
+    "JUPYTERHUB_MEM_GUARANTEE_GB": "Memory guarantee in GB for JupyterHub users. Defaults to 2GB",
+    "JUPYTERHUB_CPU_LIMIT": "CPU limit for JupyterHub users. Defaults to 2 cores",
+    "BERDL_TOLERATIONS": (
+        "Comma-separated list of tolerations in format 'key=value:effect' "
+        "(e.g., 'environments=dev:NoSchedule,environments=prod:NoSchedule')"
+    ),
+}
 
-    optional_vars = {
-        "NODE_SELECTOR_HOSTNAME": "Kubernetes node hostname",
-        "JUPYTERHUB_DEBUG": "Enable debug mode",
-        "JUPYTERHUB_LOG_LEVEL": "Set JupyterHub log level. Default is INFO",
-        "DEFAULT_MASTER_CORES": "Default master cores for Spark clusters",
-        "DEFAULT_MASTER_MEMORY": "Default master memory for Spark clusters",
-        "DEFAULT_WORKER_COUNT": "Default number of worker nodes for Spark clusters",
-        "DEFAULT_WORKER_CORES": "Default worker cores for Spark clusters",
-        "DEFAULT_WORKER_MEMORY": "Default worker memory for Spark clusters",
-        "MINIO_SECURE_FLAG": "Flag indicating if MinIO uses HTTPS to inject into the users env. Defaults to True",
-        "ENABLE_IDLE_CULLER": "Enable idle culler for JupyterHub. Defaults to True",
-        "JUPYTERHUB_IDLE_TIMEOUT_SECONDS": "Idle Culler timeout seconds. Defaults to 3600 seconds (1 hour)",
-        "JUPYTERHUB_MEM_LIMIT_GB": "Memory limit in GB for JupyterHub users. Defaults to 4GB",
-        "JUPYTERHUB_MEM_GUARANTEE_GB": "Memory guarantee in GB for JupyterHub users. Defaults to 2GB",
-        "JUPYTERHUB_CPU_LIMIT": "CPU limit for JupyterHub users. Defaults to 2 cores",
-        "BERDL_TOLERATIONS": (
-            "Comma-separated list of tolerations in format 'key=value:effect' "
-            "(e.g., 'environments=dev:NoSchedule,environments=prod:NoSchedule')"
-        ),
-    }
 
+def validate_environment():
+    """Validate that all required environment variables are set."""
     # Check required variables
     missing = []
-    for var, description in required_vars.items():
+    for var, description in REQUIRED_ENV_VARS.items():
         if var not in os.environ:
             missing.append(f"  - {var}: {description}")
 
@@ -64,6 +65,6 @@ def validate_environment():
     logger.info("Environment validation successful!")
     logger.info("")
     logger.info("Optional variables status:")
-    for var, description in optional_vars.items():
+    for var, description in OPTIONAL_ENV_VARS.items():
         status = "✓ Set" if var in os.environ else "✗ Not set"
         logger.info(f"  {status}: {var} ({description})")
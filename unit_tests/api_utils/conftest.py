@@ -0,0 +1,17 @@
+"""Shared fixtures for the API utility tests."""
+
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+
+@pytest.fixture
+def spawner():
+    """Stand-in spawner with only the attributes the API utilities use."""
+    return SimpleNamespace(
+        environment={},
+        log=Mock(spec_set=["debug", "info", "warning", "error", "exception"]),
+        user=SimpleNamespace(name="testuser"),
+        user_options={},
+    )
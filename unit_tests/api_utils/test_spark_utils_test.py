@@ -1,5 +1,6 @@
-import os
-from unittest.mock import AsyncMock, Mock, patch
+import re
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from spark_manager_client.models import (
@@ -15,6 +16,44 @@ from berdlhub.api_utils.spark_utils import (
 )
 
 
+def _response(status_code, content=None, parsed=None):
+    """Stand-in for the generated client's Response with the attributes SparkClusterManager reads."""
+    return SimpleNamespace(status_code=status_code, content=content, parsed=parsed)
+
+
+# Parsed API responses; tests only read them
+_CREATE_RESP = SparkClusterCreateResponse(
+    cluster_id="test-cluster-123",
+    master_url="spark://test:7077",
+    master_ui_url="http://test:8080",
+)
+_DELETE_RESP = ClusterDeleteResponse(message="Cluster deleted successfully")
+
+# Expected API error messages
+_OPERATION_400_RE = re.compile(r"Test operation failed \(HTTP 400\): Bad Request")
+_OPERATION_500_RE = re.compile(r"Test operation failed \(HTTP 500\)")
+_CREATE_400_RE = re.compile(r"Cluster creation failed \(HTTP 400\): Invalid config")
+
+# Cluster sizes of the predefined profiles
+_MEDIUM_DEFAULTS = ClusterDefaults(
+    worker_count=5, worker_cores=3, worker_memory="20GiB", master_cores=1, master_memory="2GiB"
+)
+_LARGE_DEFAULTS = ClusterDefaults(
+    worker_count=10, worker_cores=6, worker_memory="40GiB", master_cores=2, master_memory="8GiB"
+)
+
+
+@pytest.fixture(scope="module")
+def manager():
+    """Create a SparkClusterManager shared by the tests in this module.
+
+    Tests must not leave state on it; replace methods with ``patch.object`` rather than assignment.
+    """
+    with patch("berdlhub.api_utils.spark_utils.AuthenticatedClient"), pytest.MonkeyPatch.context() as mp:
+        mp.setenv("SPARK_CLUSTER_MANAGER_API_URL", "http://test-api")
+        return SparkClusterManager("test-token")
+
+
 class TestClusterDefaults:
     """Test cases for ClusterDefaults dataclass."""
 
@@ -42,32 +81,17 @@ class TestClusterDefaults:
         assert defaults.master_cores == 2
         assert defaults.master_memory == "4GiB"
 
-    def test_from_profile_medium(self):
-        """Test loading from medium profile."""
-        defaults = ClusterDefaults.from_profile("medium")
-        assert defaults.worker_count == 5
-        assert defaults.worker_cores == 3
-        assert defaults.worker_memory == "20GiB"
-        assert defaults.master_cores == 1
-        assert defaults.master_memory == "2GiB"
-
-    def test_from_profile_large(self):
-        """Test loading from large profile."""
-        defaults = ClusterDefaults.from_profile("large")
-        assert defaults.worker_count == 10
-        assert defaults.worker_cores == 6
-        assert defaults.worker_memory == "40GiB"
-        assert defaults.master_cores == 2
-        assert defaults.master_memory == "8GiB"
-
-    def test_from_profile_unknown_fallback(self):
-        """Test loading from unknown profile falls back to large."""
-        defaults = ClusterDefaults.from_profile("unknown")
-        assert defaults.worker_count == 10
-        assert defaults.worker_cores == 6
-        assert defaults.worker_memory == "40GiB"
-        assert defaults.master_cores == 2
-        assert defaults.master_memory == "8GiB"
+    @pytest.mark.parametrize(
+        "profile_slug, expected",
+        [
+            pytest.param("medium", _MEDIUM_DEFAULTS, id="medium"),
+            pytest.param("large", _LARGE_DEFAULTS, id="large"),
+            pytest.param("unknown", _LARGE_DEFAULTS, id="unknown_falls_back_to_large"),
+        ],
+    )
+    def test_from_profile(self, profile_slug, expected):
+        """Test loading defaults from a profile, with unknown profiles falling back to large."""
+        assert ClusterDefaults.from_profile(profile_slug) == expected
 
 
 class TestSparkClusterManager:
@@ -79,12 +103,6 @@ class TestSparkClusterManager:
         with patch("berdlhub.api_utils.spark_utils.AuthenticatedClient") as mock:
             yield mock
 
-    @pytest.fixture
-    def manager(self, mock_client):
-        """Create SparkClusterManager instance for testing."""
-        with patch.dict(os.environ, {"SPARK_CLUSTER_MANAGER_API_URL": "http://test-api"}):
-            return SparkClusterManager("test-token")
-
     def test_init_with_api_url(self, mock_client):
         """Test initialization with explicit API URL."""
         manager = SparkClusterManager("test-token", "http://custom-api")
@@ -92,36 +110,66 @@ class TestSparkClusterManager:
         assert manager.api_url == "http://custom-api"
         mock_client.assert_called_once_with(base_url="http://custom-api", token="test-token")
 
-    @patch.dict(os.environ, {"SPARK_CLUSTER_MANAGER_API_URL": "http://env-api"})
-    def test_init_with_env_api_url(self, mock_client):
+    def test_init_with_env_api_url(self, mock_client, monkeypatch):
         """Test initialization with API URL from environment."""
+        monkeypatch.setenv("SPARK_CLUSTER_MANAGER_API_URL", "http://env-api")
         manager = SparkClusterManager("test-token")
         assert manager.api_url == "http://env-api"
 
-    def test_init_without_api_url_raises_error(self, mock_client):
+    def test_init_without_api_url_raises_error(self, mock_client, monkeypatch):
         """Test initialization fails without API URL."""
-        with patch.dict(os.environ, {}, clear=True):
-            with pytest.raises(KeyError):
-                SparkClusterManager("test-token")
+        monkeypatch.delenv("SPARK_CLUSTER_MANAGER_API_URL", raising=False)
+        with pytest.raises(KeyError):
+            SparkClusterManager("test-token")
+
+    @pytest.mark.asyncio
+    async def test_aclose(self, manager):
+        """Test closing the manager closes the API client's httpx client."""
+        with patch.object(manager, "client") as mock_client, patch.object(manager, "_client_used", True):
+            mock_client.get_async_httpx_client.return_value.aclose = AsyncMock()
+
+            await manager.aclose()
+
+        mock_client.get_async_httpx_client.return_value.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_aclose_without_requests(self, manager):
+        """Test closing a manager that never made a request does not build an httpx client."""
+        with patch.object(manager, "client") as mock_client, patch.object(manager, "_client_used", False):
+            await manager.aclose()
+
+        mock_client.get_async_httpx_client.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("berdlhub.api_utils.spark_utils.delete_cluster_clusters_delete.asyncio_detailed")
+    @patch("berdlhub.api_utils.spark_utils.create_cluster_clusters_post.asyncio_detailed")
+    async def test_client_is_reused_across_calls(self, mock_create, mock_delete, mock_client, spawner):
+        """Test that every API call goes through the one client built at init."""
+        mock_create.return_value = _response(status_code=201, parsed=_CREATE_RESP)
+        mock_delete.return_value = _response(status_code=204, parsed=None)
+        manager = SparkClusterManager("test-token", "http://custom-api")
+
+        await manager.start_spark_cluster(spawner)
+        await manager.stop_spark_cluster(spawner)
+
+        mock_client.assert_called_once()
+        assert mock_create.call_args.kwargs["client"] is manager.client
+        assert mock_delete.call_args.kwargs["client"] is manager.client
 
     @pytest.mark.asyncio
     async def test_raise_api_error(self, manager):
         """Test API error handling."""
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_response.content = "Bad Request"
+        mock_response = _response(status_code=400, content="Bad Request")
 
-        with pytest.raises(SparkClusterError, match="Test operation failed \\(HTTP 400\\): Bad Request"):
+        with pytest.raises(SparkClusterError, match=_OPERATION_400_RE):
             await manager._raise_api_error(mock_response, "Test operation")
 
     @pytest.mark.asyncio
     async def test_raise_api_error_no_content(self, manager):
         """Test API error handling without content."""
-        mock_response = Mock()
-        mock_response.status_code = 500
-        mock_response.content = None
+        mock_response = _response(status_code=500, content=None)
 
-        with pytest.raises(SparkClusterError, match="Test operation failed \\(HTTP 500\\)"):
+        with pytest.raises(SparkClusterError, match=_OPERATION_500_RE):
             await manager._raise_api_error(mock_response, "Test operation")
 
     @pytest.mark.asyncio
@@ -129,19 +177,9 @@ class TestSparkClusterManager:
     async def test_create_cluster_success(self, mock_create, manager):
         """Test successful cluster creation."""
         # Mock response
-        mock_response = Mock()
-        mock_response.status_code = 201
-        mock_response.parsed = SparkClusterCreateResponse(
-            cluster_id="test-cluster-123",
-            master_url="spark://test:7077",
-            master_ui_url="http://test:8080",
-        )
+        mock_response = _response(status_code=201, parsed=_CREATE_RESP)
         mock_create.return_value = mock_response
 
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
         result = await manager.create_cluster(
             worker_count=3,
             worker_cores=2,
@@ -158,20 +196,10 @@ class TestSparkClusterManager:
     async def test_create_cluster_failure(self, mock_create, manager):
         """Test cluster creation failure."""
         # Mock failed response
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_response.content = "Invalid config"
-        mock_response.parsed = None
+        mock_response = _response(status_code=400, content="Invalid config", parsed=None)
         mock_create.return_value = mock_response
 
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
-        with pytest.raises(
-            SparkClusterError,
-            match="Cluster creation failed \\(HTTP 400\\): Invalid config",
-        ):
+        with pytest.raises(SparkClusterError, match=_CREATE_400_RE):
             await manager.create_cluster(
                 worker_count=2,
                 worker_cores=1,
@@ -182,146 +210,85 @@ class TestSparkClusterManager:
 
     @pytest.mark.asyncio
     @patch("berdlhub.api_utils.spark_utils.delete_cluster_clusters_delete.asyncio_detailed")
-    async def test_stop_spark_cluster_success(self, mock_delete, manager):
+    async def test_stop_spark_cluster_success(self, mock_delete, manager, spawner):
         """Test successful cluster deletion."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-
         # Mock response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.parsed = ClusterDeleteResponse(message="Cluster deleted successfully")
+        mock_response = _response(status_code=200, parsed=_DELETE_RESP)
         mock_delete.return_value = mock_response
 
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
-        result = await manager.stop_spark_cluster(mock_spawner)
+        result = await manager.stop_spark_cluster(spawner)
 
         assert result is not None
         mock_delete.assert_called_once()
 
     @pytest.mark.asyncio
     @patch("berdlhub.api_utils.spark_utils.delete_cluster_clusters_delete.asyncio_detailed")
-    async def test_stop_spark_cluster_204_response(self, mock_delete, manager):
+    async def test_stop_spark_cluster_204_response(self, mock_delete, manager, spawner):
         """Test cluster deletion with 204 response."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-
         # Mock response
-        mock_response = Mock()
-        mock_response.status_code = 204
-        mock_response.parsed = None
+        mock_response = _response(status_code=204, parsed=None)
         mock_delete.return_value = mock_response
 
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
-        result = await manager.stop_spark_cluster(mock_spawner)
+        result = await manager.stop_spark_cluster(spawner)
 
         assert result is None
         mock_delete.assert_called_once()
 
     @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "delete_behavior",
+        [
+            pytest.param(
+                {"return_value": _response(status_code=404, content="Cluster not found")},
+                id="http_error",
+            ),
+            pytest.param({"side_effect": Exception("Network error")}, id="exception"),
+        ],
+    )
     @patch("berdlhub.api_utils.spark_utils.delete_cluster_clusters_delete.asyncio_detailed")
-    async def test_stop_spark_cluster_failure(self, mock_delete, manager):
-        """Test cluster deletion failure - should not raise exception."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-
-        # Mock failed response
-        mock_response = Mock()
-        mock_response.status_code = 404
-        mock_response.content = "Cluster not found"
-        mock_delete.return_value = mock_response
-
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
-        # Should not raise exception
-        result = await manager.stop_spark_cluster(mock_spawner)
-        assert result is None
-
-    @pytest.mark.asyncio
-    @patch("berdlhub.api_utils.spark_utils.delete_cluster_clusters_delete.asyncio_detailed")
-    async def test_stop_spark_cluster_exception(self, mock_delete, manager):
-        """Test cluster deletion with exception."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
+    async def test_stop_spark_cluster_error(self, mock_delete, delete_behavior, manager, spawner):
+        """Test cluster deletion failures are logged rather than raised."""
+        mock_delete.configure_mock(**delete_behavior)
 
-        # Mock exception
-        mock_delete.side_effect = Exception("Network error")
-
-        # Mock client context manager
-        manager.client.__aenter__ = AsyncMock(return_value=manager.client)
-        manager.client.__aexit__ = AsyncMock(return_value=None)
-
-        # Should not raise exception, just log error
-        result = await manager.stop_spark_cluster(mock_spawner)
+        result = await manager.stop_spark_cluster(spawner)
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_start_spark_cluster_success(self, manager):
+    async def test_start_spark_cluster_success(self, manager, spawner):
         """Test successful cluster start for spawner."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-        mock_spawner.environment = {}
-        mock_spawner.profile_list = [{"slug": "large", "display_name": "Large"}]
-        mock_spawner.user_options = {"profile": "large"}
-
-        # Mock create_cluster method
-        mock_response = SparkClusterCreateResponse(
-            cluster_id="test-cluster-123",
-            master_url="spark://test:7077",
-            master_ui_url="http://test:8080",
-        )
-        manager.create_cluster = AsyncMock(return_value=mock_response)
+        spawner.user_options = {"profile": "large"}
 
-        result = await manager.start_spark_cluster(mock_spawner)
+        # Mock create_cluster_from_config method
+        with patch.object(manager, "create_cluster_from_config", AsyncMock(return_value=_CREATE_RESP)) as mock_create:
+            result = await manager.start_spark_cluster(spawner)
 
         assert result == "spark://test:7077"
-        assert mock_spawner.environment["SPARK_MASTER_URL"] == "spark://test:7077"
-        manager.create_cluster.assert_called_once()
+        assert spawner.environment["SPARK_MASTER_URL"] == "spark://test:7077"
+        assert spawner.environment["SPARK_WORKER_COUNT"] == "10"
+        assert spawner.environment["SPARK_WORKER_MEMORY"] == "40GiB"
+        mock_create.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_start_spark_cluster_no_master_url(self, manager):
+    async def test_start_spark_cluster_no_master_url(self, manager, spawner):
         """Test cluster start failure when no master URL in response."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-        mock_spawner.profile_list = [{"slug": "medium", "display_name": "Medium"}]
-        mock_spawner.user_options = {"profile": "medium"}
+        spawner.user_options = {"profile": "medium"}
 
-        # Mock create_cluster method with response without master_url
-        mock_response = Mock()
-        mock_response.master_url = None
-        manager.create_cluster = AsyncMock(return_value=mock_response)
-
-        with pytest.raises(SparkClusterError, match="Master URL not found in response"):
-            await manager.start_spark_cluster(mock_spawner)
+        # Mock create_cluster_from_config method with response without master_url
+        mock_response = SimpleNamespace(master_url=None)
+        with patch.object(manager, "create_cluster_from_config", AsyncMock(return_value=mock_response)):
+            with pytest.raises(SparkClusterError, match="Master URL not found in response"):
+                await manager.start_spark_cluster(spawner)
 
     @pytest.mark.asyncio
-    async def test_start_spark_cluster_create_failure(self, manager):
-        """Test cluster start failure when create_cluster fails."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-        mock_spawner.profile_list = [{"slug": "medium", "display_name": "Medium"}]
-        mock_spawner.user_options = {"profile": "medium"}
-
-        # Mock create_cluster method to raise exception
-        manager.create_cluster = AsyncMock(side_effect=SparkClusterError("Creation failed"))
+    async def test_start_spark_cluster_create_failure(self, manager, spawner):
+        """Test cluster start failure when create_cluster_from_config fails."""
+        spawner.user_options = {"profile": "medium"}
 
-        with pytest.raises(SparkClusterError, match="Creation failed"):
-            await manager.start_spark_cluster(mock_spawner)
+        # Mock create_cluster_from_config method to raise exception
+        mock_create = AsyncMock(side_effect=SparkClusterError("Creation failed"))
+        with patch.object(manager, "create_cluster_from_config", mock_create):
+            with pytest.raises(SparkClusterError, match="Creation failed"):
+                await manager.start_spark_cluster(spawner)
 
 
 class TestSparkClusterError:
@@ -341,7 +308,7 @@ class TestSparkClusterManagerIntegration:
     """Integration test cases."""
 
     @pytest.fixture
-    def manager_with_env(self):
+    def manager_with_env(self, monkeypatch):
         """Create manager with environment variables set."""
         env_vars = {
             "SPARK_CLUSTER_MANAGER_API_URL": "http://test-api",
@@ -352,41 +319,28 @@ class TestSparkClusterManagerIntegration:
             "DEFAULT_MASTER_MEMORY": "3GiB",
         }
 
-        with patch.dict(os.environ, env_vars):
-            with patch("berdlhub.api_utils.spark_utils.AuthenticatedClient"):
-                yield SparkClusterManager("test-token")
+        for name, value in env_vars.items():
+            monkeypatch.setenv(name, value)
+
+        with patch("berdlhub.api_utils.spark_utils.AuthenticatedClient"):
+            yield SparkClusterManager("test-token")
 
     @pytest.mark.asyncio
-    async def test_full_cluster_lifecycle(self, manager_with_env):
+    async def test_full_cluster_lifecycle(self, manager_with_env, spawner):
         """Test complete cluster lifecycle (create -> delete)."""
-        # Mock spawner
-        mock_spawner = Mock()
-        mock_spawner.user.name = "testuser"
-        mock_spawner.environment = {}
-        mock_spawner.profile_list = [{"slug": "large", "display_name": "Large"}]
-        mock_spawner.user_options = {"profile": "large"}
-
-        # Mock create_cluster
-        create_response = SparkClusterCreateResponse(
-            cluster_id="test-cluster-123",
-            master_url="spark://test:7077",
-            master_ui_url="http://test:8080",
-        )
-        manager_with_env.create_cluster = AsyncMock(return_value=create_response)
+        spawner.user_options = {"profile": "large"}
+
+        # Mock create_cluster_from_config
+        manager_with_env.create_cluster_from_config = AsyncMock(return_value=_CREATE_RESP)
 
         # Mock stop_spark_cluster
-        delete_response = ClusterDeleteResponse(message="Cluster deleted successfully")
-        manager_with_env.stop_spark_cluster = AsyncMock(return_value=delete_response)
+        manager_with_env.stop_spark_cluster = AsyncMock(return_value=_DELETE_RESP)
 
         # Test create
-        master_url = await manager_with_env.start_spark_cluster(mock_spawner)
+        master_url = await manager_with_env.start_spark_cluster(spawner)
         assert master_url == "spark://test:7077"
-        assert mock_spawner.environment["SPARK_MASTER_URL"] == "spark://test:7077"
+        assert spawner.environment["SPARK_MASTER_URL"] == "spark://test:7077"
 
         # Test delete
-        result = await manager_with_env.stop_spark_cluster(mock_spawner)
-        assert result == delete_response
-
-
-if __name__ == "__main__":
-    pytest.main([__file__])
+        result = await manager_with_env.stop_spark_cluster(spawner)
+        assert result == _DELETE_RESP
@@ -0,0 +1,93 @@
+"""Tests for the KBase auth client."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from berdlhub.auth.kb_auth import InvalidTokenError, KBaseAuth
+from berdlhub.auth.kb_user import UserID
+
+
+def _responses(url, headers):
+    if url.endswith("token"):
+        return {"expires": None, "mfa": "USED"}
+    return {"user": "testuser", "customroles": ["BERDL_USER"]}
+
+
+class TestValidateTokenCache:
+    """Test cases for the validated token cache."""
+
+    @pytest.fixture
+    def kb_auth(self):
+        return KBaseAuth("https://auth.kbase.us/", ["KBASE_ADMIN"], ["BERDL_USER"])
+
+    @pytest.mark.asyncio
+    async def test_repeated_validation_uses_cache(self, kb_auth):
+        """Test that a token validated once is served from the cache."""
+        with patch.object(KBaseAuth, "_get", AsyncMock(side_effect=_responses)) as mock_get:
+            first = await kb_auth.validate_token("token")
+            second = await kb_auth.validate_token("token")
+
+        assert first == second
+        assert first.user == UserID("testuser")
+        assert mock_get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_refetched(self, kb_auth):
+        """Test that the auth server is contacted again once the cache entry expires."""
+        with patch.object(KBaseAuth, "_get", AsyncMock(side_effect=_responses)) as mock_get:
+            user = await kb_auth.validate_token("token")
+            for key in kb_auth._token_cache:
+                kb_auth._token_cache[key] = (0.0, user)
+            await kb_auth.validate_token("token")
+
+        assert mock_get.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_cache_bypass_is_refetched(self, kb_auth):
+        """Test that use_cache=False contacts the auth server even for a cached token."""
+        with patch.object(KBaseAuth, "_get", AsyncMock(side_effect=_responses)) as mock_get:
+            await kb_auth.validate_token("token")
+            user = await kb_auth.validate_token("token", use_cache=False)
+
+        assert user.user == UserID("testuser")
+        assert mock_get.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_not_cached(self, kb_auth):
+        """Test that invalid tokens are rejected on every call."""
+        mock_get = AsyncMock(side_effect=InvalidTokenError("bad token"))
+        with patch.object(KBaseAuth, "_get", mock_get):
+            for _ in range(2):
+                with pytest.raises(InvalidTokenError):
+                    await kb_auth.validate_token("token")
+
+        assert kb_auth._token_cache == {}
+        assert mock_get.await_count == 4
+
+
+class TestSession:
+    """Test cases for the pooled HTTP session."""
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused_across_requests(self):
+        """Test that requests share one session until it is closed."""
+        kb_auth = KBaseAuth("https://auth.kbase.us/", [], ["BERDL_USER"])
+        response = MagicMock(status=200, read=AsyncMock(return_value=b'{"user": "testuser"}'))
+        with patch("berdlhub.auth.kb_auth.aiohttp") as mock_aiohttp:
+            session = mock_aiohttp.ClientSession.return_value
+            session.closed = False
+            session.get.return_value.__aenter__.return_value = response
+
+            assert await kb_auth._get(kb_auth._me_url, {}) == {"user": "testuser"}
+            await kb_auth._get(kb_auth._token_url, {})
+            assert mock_aiohttp.ClientSession.call_count == 1
+            assert session.get.call_count == 2
+
+            session.close = AsyncMock()
+            await kb_auth.aclose()
+            session.close.assert_awaited_once()
+
+            session.closed = True
+            await kb_auth._get(kb_auth._me_url, {})
+            assert mock_aiohttp.ClientSession.call_count == 2
@@ -0,0 +1,101 @@
+"""Tests for the KBase JupyterHub authenticator."""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from berdlhub.auth.kb_auth import AdminPermission, KBaseUser, MissingTokenError
+from berdlhub.auth.kb_user import UserID
+
+
+@pytest.fixture(scope="module")
+def kb_jupyterhub_auth():
+    """The authenticator module, imported with the auth URL it reads at class definition."""
+    with patch.dict(os.environ, {"KBASE_AUTH_URL": "https://auth.kbase.us/"}):
+        from berdlhub.auth import kb_jupyterhub_auth
+
+    return kb_jupyterhub_auth
+
+
+def _user(auth_state):
+    user = Mock()
+    user.name = "testuser"
+    user.get_auth_state = AsyncMock(return_value=auth_state)
+    return user
+
+
+class TestKBaseAuth:
+    """Test cases for the authenticator's shared KBase auth client."""
+
+    @pytest.mark.asyncio
+    async def test_session_is_closed_on_shutdown(self, kb_jupyterhub_auth):
+        """Test that cancelling the remaining tasks, as the hub does on shutdown, closes the auth client."""
+        authenticator = kb_jupyterhub_auth.KBaseAuthenticator()
+        with patch.object(kb_jupyterhub_auth.KBaseAuth, "aclose", AsyncMock()) as mock_aclose:
+            assert authenticator.kb_auth is authenticator.kb_auth
+            await asyncio.sleep(0)
+            mock_aclose.assert_not_awaited()
+
+            authenticator._kb_auth_closer.cancel()
+            await asyncio.wait({authenticator._kb_auth_closer})
+
+        mock_aclose.assert_awaited_once()
+
+
+class TestPreSpawnStart:
+    """Test cases for pre_spawn_start's hand-off to the spawner."""
+
+    @pytest.mark.asyncio
+    async def test_auth_state_is_handed_to_spawner(self, kb_jupyterhub_auth):
+        """Test that the token is exported and the decrypted auth state left where the pre-spawn hook reads it."""
+        auth_state = {"kbase_token": "token"}
+        spawner = SimpleNamespace(environment={})
+
+        await kb_jupyterhub_auth.KBaseAuthenticator().pre_spawn_start(_user(auth_state), spawner)
+
+        assert spawner.environment["KBASE_AUTH_TOKEN"] == "token"
+        assert vars(spawner)[kb_jupyterhub_auth.AUTH_STATE_SPAWNER_ATTR] is auth_state
+
+    @pytest.mark.asyncio
+    async def test_missing_token_raises(self, kb_jupyterhub_auth):
+        """Test that a spawn without a KBase token in the auth state is refused."""
+        spawner = SimpleNamespace(environment={})
+
+        with pytest.raises(MissingTokenError):
+            await kb_jupyterhub_auth.KBaseAuthenticator().pre_spawn_start(_user(None), spawner)
+
+        assert kb_jupyterhub_auth.AUTH_STATE_SPAWNER_ATTR not in vars(spawner)
+
+
+class TestRefreshUser:
+    """Test cases for refresh_user."""
+
+    @pytest.fixture
+    def authenticator(self, kb_jupyterhub_auth):
+        authenticator = kb_jupyterhub_auth.KBaseAuthenticator()
+        authenticator.db = Mock()
+        expires = datetime.now(timezone.utc) + timedelta(days=1)
+        kb_user = KBaseUser(UserID("testuser"), AdminPermission.NONE, "token", expires, "Used")
+        authenticator.kb_auth = Mock(validate_token=AsyncMock(return_value=kb_user))
+        return authenticator
+
+    @pytest.mark.asyncio
+    async def test_refresh_validates_with_kbase(self, authenticator):
+        """Test that every refresh JupyterHub makes validates the token, allowing the auth client's cache."""
+        user = _user({"kbase_token": "token", "token_expires": None})
+
+        assert await authenticator.refresh_user(user, None) is True
+        authenticator.kb_auth.validate_token.assert_awaited_once_with("token", use_cache=True)
+        assert user.db.auth_state["token_expires"] is not None
+
+    @pytest.mark.asyncio
+    async def test_force_bypasses_token_cache(self, authenticator):
+        """Test that a forced refresh always reaches KBase, skipping the auth client's token cache."""
+        user = _user({"kbase_token": "token", "token_expires": None})
+
+        assert await authenticator.refresh_user(user, None, force=True) is True
+        authenticator.kb_auth.validate_token.assert_awaited_once_with("token", use_cache=False)
@@ -0,0 +1,49 @@
+"""Shared fixtures for the hub configuration tests."""
+
+import os
+from types import MappingProxyType, SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def cfg():
+    """Stand-in for the JupyterHub config object ``c`` with an empty KubeSpawner section."""
+    return SimpleNamespace(KubeSpawner=SimpleNamespace())
+
+
+@pytest.fixture(scope="session")
+def base_env():
+    """Complete set of required hub environment variables; copy it before changing anything."""
+    return MappingProxyType(
+        {
+            "JUPYTERHUB_COOKIE_SECRET_64_HEX_CHARS": "test_secret_64_chars_long_string_here_for_testing_purposes",
+            "JUPYTERHUB_TEMPLATES_DIR": "/path/to/templates",
+            "KBASE_ORIGIN": "https://kbase.us",
+            "KBASE_AUTH_URL": "https://auth.kbase.us",
+            "CDM_TASK_SERVICE_URL": "https://cdm.kbase.us",
+            "GOVERNANCE_API_URL": "https://governance.kbase.us",
+            "MINIO_ENDPOINT_URL": "https://minio.kbase.us",
+            "SPARK_CLUSTER_MANAGER_API_URL": "https://spark.kbase.us",
+            "BERDL_HIVE_METASTORE_URI": "thrift://hive:9083",
+            "BERDL_NOTEBOOK_IMAGE_TAG": "latest",
+            "BERDL_SKIP_SPAWN_HOOKS": "false",
+            "BERDL_NOTEBOOK_HOMES_DIR": "/mnt/state/dev/hub",
+        }
+    )
+
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    """Empty the process environment for the test; returns monkeypatch to set variables on."""
+    for name in list(os.environ):
+        monkeypatch.delenv(name)
+    return monkeypatch
+
+
+@pytest.fixture
+def hub_env(clean_env, base_env):
+    """Environment holding exactly the required hub variables; returns monkeypatch to adjust it."""
+    for name, value in base_env.items():
+        clean_env.setenv(name, value)
+    return clean_env
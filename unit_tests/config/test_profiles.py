@@ -0,0 +1,31 @@
+"""Tests for server profile configuration."""
+
+from types import SimpleNamespace
+
+from berdlhub.config.profiles import DEFAULT_PROFILE, PROFILE_SPECS, configure_profiles
+
+
+class TestConfigureProfiles:
+    """Test cases for profile configuration."""
+
+    def test_configure_profiles_uses_image_tag(self, cfg, monkeypatch):
+        """Test that every profile runs the configured notebook image."""
+        monkeypatch.setenv("BERDL_NOTEBOOK_IMAGE_TAG", "test-image:v1.0.0")
+
+        configure_profiles(cfg)
+
+        profile_list = cfg.KubeSpawner.profile_list
+        assert [p["slug"] for p in profile_list] == [slug for slug, _, _ in PROFILE_SPECS]
+        assert all(p["kubespawner_override"]["image"] == "test-image:v1.0.0" for p in profile_list)
+        assert [p["slug"] for p in profile_list if p.get("default")] == [DEFAULT_PROFILE]
+
+    def test_each_config_gets_its_own_profile_list(self, cfg, monkeypatch):
+        """Test that changing one configured profile list does not affect the next."""
+        monkeypatch.setenv("BERDL_NOTEBOOK_IMAGE_TAG", "test-image:v1.0.0")
+        other = SimpleNamespace(KubeSpawner=SimpleNamespace())
+
+        configure_profiles(cfg)
+        cfg.KubeSpawner.profile_list[0]["kubespawner_override"]["image"] = "changed"
+        configure_profiles(other)
+
+        assert other.KubeSpawner.profile_list[0]["kubespawner_override"]["image"] == "test-image:v1.0.0"
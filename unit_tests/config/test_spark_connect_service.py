@@ -0,0 +1,86 @@
+"""Tests for Spark Connect service helpers."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from kubernetes import client
+
+from berdlhub.config import spark_connect_service
+from berdlhub.config.spark_connect_service import create_user_notebook_service, sanitize_k8s_name
+
+
+class TestSanitizeK8sName:
+    """Test cases for Kubernetes name sanitization."""
+
+    @pytest.mark.parametrize(
+        "name, expected",
+        [
+            ("alice", "alice"),
+            ("Alice_Smith", "alice-smith"),
+            ("user__name", "user-name"),
+            ("_leading", "leading"),
+            ("trailing.-", "trailing"),
+            ("-.mixed_Case.name_", "mixed-case.name"),
+            ("a@b!c", "a-b-c"),
+            ("___", ""),
+        ],
+    )
+    def test_sanitize_k8s_name(self, name, expected):
+        """Test that names are lowercased, invalid characters replaced, and ends trimmed."""
+        assert sanitize_k8s_name(name) == expected
+
+    def test_sanitize_k8s_name_truncates(self):
+        """Test that names are truncated to the Kubernetes limit."""
+        assert len(sanitize_k8s_name("a" * 300)) == 253
+
+
+class TestCreateUserNotebookService:
+    """Test cases for the server-side apply of the notebook Service."""
+
+    @pytest.fixture
+    def spawner(self):
+        return SimpleNamespace(user=SimpleNamespace(name="Test_User"), namespace="ns", log=Mock())
+
+    @pytest.fixture
+    def request_mock(self):
+        """Patch the Kubernetes client's HTTP pool so requests are recorded instead of sent."""
+        v1 = client.CoreV1Api(client.ApiClient(client.Configuration(host="https://k8s.test")))
+        with (
+            patch.object(spark_connect_service, "_core_v1_api", return_value=v1),
+            patch.object(v1.api_client.rest_client.pool_manager, "request") as request,
+        ):
+            yield request
+
+    def test_service_is_applied_with_one_patch(self, spawner, request_mock):
+        """Test that the Service is sent as a single server-side apply PATCH."""
+        request_mock.return_value = Mock(status=200, reason="OK", data=b'{"kind": "Service"}')
+
+        create_user_notebook_service(spawner)
+
+        request_mock.assert_called_once()
+        (method, url), kwargs = request_mock.call_args
+        assert method == "PATCH"
+        assert url == (
+            "https://k8s.test/api/v1/namespaces/ns/services/jupyter-test-user?fieldManager=berdl-jupyterhub&force=true"
+        )
+        assert kwargs["headers"]["Content-Type"] == "application/apply-patch+yaml"
+        body = json.loads(kwargs["body"])
+        assert body["metadata"]["name"] == "jupyter-test-user"
+        assert body["spec"]["selector"]["hub.jupyter.org/username"] == "Test_User"
+        assert body["metadata"]["labels"] == {
+            **body["spec"]["selector"],
+            "app.kubernetes.io/managed-by": "jupyterhub",
+        }
+        assert [port["port"] for port in body["spec"]["ports"]] == [8888, 15002]
+        spawner.log.error.assert_not_called()
+
+    def test_api_error_is_logged_not_raised(self, spawner, request_mock):
+        """Test that a failed apply is logged without failing the spawn."""
+        request_mock.return_value = Mock(status=409, reason="Conflict", data=b"{}")
+
+        create_user_notebook_service(spawner)
+
+        spawner.log.error.assert_called_once()
+        assert isinstance(spawner.log.error.call_args[0][2], client.exceptions.ApiException)
@@ -0,0 +1,22 @@
+"""Shared fixtures for the unit tests."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def hooks():
+    """The berdlhub.config.hooks module, imported once with the Spark manager client mocked out."""
+    # Mock the dependencies that are not available in test environment. The mocks only stay in
+    # sys.modules for the import, so tests of the real Spark manager client are unaffected.
+    with patch.dict(
+        "sys.modules",
+        {
+            "berdlhub.api_utils.spark_utils": Mock(),
+            "spark_manager_client": Mock(),
+        },
+    ):
+        from berdlhub.config import hooks
+
+    return hooks
@@ -1,254 +1,384 @@
-import os
-from unittest.mock import Mock, patch
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 
+import pytest
 
-# Mock the dependencies that are not available in test environment
-with patch.dict(
-    "sys.modules",
+EXPECTED_POD_ENV_VARS = frozenset(
     {
-        "berdlhub.api_utils.spark_utils": Mock(),
-        "spark_manager_client": Mock(),
-    },
-):
-    from berdlhub.config.hooks import modify_pod_hook
+        "BERDL_POD_IP",
+        "BERDL_POD_NAME",
+        "BERDL_CPU_REQUEST",
+        "BERDL_CPU_LIMIT",
+        "BERDL_MEMORY_REQUEST",
+        "BERDL_MEMORY_LIMIT",
+    }
+)
 
 
-class TestModifyPodHook:
-    """Test suite for modify_pod_hook function."""
+class _Rec:
+    """Records the positional and keyword arguments of each call."""
 
-    def test_modify_pod_hook_basic_env_vars(self):
-        """Test that basic environment variables are added to the pod."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
+    def __init__(self):
+        self.calls = []
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
 
-        # Execute
-        result = modify_pod_hook(spawner, pod)
 
-        # Verify basic environment variables are added
-        env_vars = result.spec.containers[0].env
-        env_var_names = [env_var.name for env_var in env_vars]
-
-        expected_env_vars = [
-            "BERDL_POD_IP",
-            "BERDL_POD_NAME",
-            "BERDL_CPU_REQUEST",
-            "BERDL_CPU_LIMIT",
-            "BERDL_MEMORY_REQUEST",
-            "BERDL_MEMORY_LIMIT",
-        ]
+def _make_pod():
+    """Minimal pod with one container, as passed to modify_pod_hook."""
+    return SimpleNamespace(
+        metadata=SimpleNamespace(labels={}),
+        spec=SimpleNamespace(containers=[SimpleNamespace(env=[])]),
+    )
 
-        for expected_var in expected_env_vars:
-            assert expected_var in env_var_names
 
-        # Verify pod is returned
-        assert result == pod
+def _env_map(pod):
+    """Map each env var name on the pod's first container to its V1EnvVar."""
+    return {env_var.name: env_var for env_var in pod.spec.containers[0].env}
 
-    def test_modify_pod_hook_no_tolerations(self):
-        """Test that no tolerations are added when BERDL_TOLERATIONS is not set."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+def _make_spawner():
+    """Minimal spawner for modify_pod_hook; log.warning records calls for the toleration tests."""
+    return SimpleNamespace(user=SimpleNamespace(name="testuser"), log=SimpleNamespace(warning=_Rec()))
 
-        # Clear environment
-        with patch.dict(os.environ, {}, clear=True):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
 
-            # Verify tolerations are not set on the spec
-            # Since we're using Mocks, we need to check if tolerations was assigned
-            # We can do this by checking if pod.spec.tolerations was assigned a list
-            # If it wasn't assigned, it should still be a Mock, not a list
-            assert not isinstance(result.spec.tolerations, list)
-
-    def test_modify_pod_hook_single_toleration(self):
-        """Test that a single toleration is correctly parsed and added."""
-        # Setup
+def _tolerations(hooks, tolerations_env, log=None):
+    """Patch the tolerations parsed at import time as if BERDL_TOLERATIONS were set to tolerations_env."""
+    parsed = hooks.parse_tolerations_from_env(tolerations_env, log or Mock())
+    return patch.object(hooks, "_BERDL_TOLERATIONS", tuple(parsed))
+
+
+class TestGetProfileEnvironment:
+    """Test suite for _get_profile_environment function."""
+
+    PROFILE_LIST = [
+        {"slug": "medium", "display_name": "Medium", "kubespawner_override": {"environment": {"SIZE": "m"}}},
+        {"slug": "large", "display_name": "Large", "kubespawner_override": {"environment": {"SIZE": "l"}}},
+    ]
+
+    def _spawner(self, profile):
         spawner = Mock()
-        spawner.log = Mock()
+        spawner.profile_list = self.PROFILE_LIST
+        spawner.user_options = {"profile": profile}
+        spawner.environment = {}
+        return spawner
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+    def test_selected_profile_environment(self, hooks):
+        """Test that the selected profile's environment and escaped profile JSON are returned."""
+        spawner = self._spawner("large")
 
-        # Set environment variable
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": "environments=dev:NoSchedule"}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
+        assert hooks._get_profile_environment(spawner) == {"SIZE": "l"}
+        assert spawner.environment["BERDL_PROFILE_JSON"].startswith('{{"slug": "large"')
 
-            # Verify toleration is added
-            assert hasattr(result.spec, "tolerations")
-            assert len(result.spec.tolerations) == 1
+    def test_unknown_profile_falls_back_to_first(self, hooks):
+        """Test that an unknown slug falls back to the first profile."""
+        spawner = self._spawner("missing")
 
-            toleration = result.spec.tolerations[0]
-            assert toleration.key == "environments"
-            assert toleration.operator == "Equal"
-            assert toleration.value == "dev"
-            assert toleration.effect == "NoSchedule"
+        assert hooks._get_profile_environment(spawner) == {"SIZE": "m"}
 
-    def test_modify_pod_hook_multiple_tolerations(self):
-        """Test that multiple tolerations are correctly parsed and added."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
+    @pytest.mark.parametrize("user_options", [None, {}, {"profile": ""}])
+    def test_no_selection_uses_default_profile(self, user_options, hooks):
+        """Test that a missing or empty profile selection goes straight to the first profile."""
+        spawner = self._spawner(None)
+        spawner.user_options = user_options
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+        assert hooks._get_profile_environment(spawner) == {"SIZE": "m"}
+        spawner.log.info.assert_called_once_with("Using default profile: %s", "Medium")
 
-        # Set environment variable with multiple tolerations
-        tolerations_str = "environments=dev:NoSchedule,environments=prod:NoSchedule"
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": tolerations_str}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
+    def test_profile_resolution_is_cached_per_spawner(self, hooks):
+        """Test that repeated calls on the same spawner do not rescan the profile list."""
+        spawner = self._spawner("large")
+        hooks._get_profile_environment(spawner)
+        spawner.log.info.reset_mock()
+        spawner.environment = {}
 
-            # Verify tolerations are added
-            assert hasattr(result.spec, "tolerations")
-            assert len(result.spec.tolerations) == 2
-
-            # Check first toleration
-            toleration1 = result.spec.tolerations[0]
-            assert toleration1.key == "environments"
-            assert toleration1.operator == "Equal"
-            assert toleration1.value == "dev"
-            assert toleration1.effect == "NoSchedule"
-
-            # Check second toleration
-            toleration2 = result.spec.tolerations[1]
-            assert toleration2.key == "environments"
-            assert toleration2.operator == "Equal"
-            assert toleration2.value == "prod"
-            assert toleration2.effect == "NoSchedule"
-
-    def test_modify_pod_hook_tolerations_with_spaces(self):
-        """Test that tolerations with extra spaces are handled correctly."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
+        assert hooks._get_profile_environment(spawner) == {"SIZE": "l"}
+        assert "BERDL_PROFILE_JSON" in spawner.environment
+        spawner.log.info.assert_not_called()
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
 
-        # Set environment variable with spaces
-        tolerations_str = " environments=dev:NoSchedule , environments=prod:NoSchedule "
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": tolerations_str}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
+class TestGetAuthToken:
+    """Test suite for _get_auth_token function."""
 
-            # Verify tolerations are added correctly despite spaces
-            assert hasattr(result.spec, "tolerations")
-            assert len(result.spec.tolerations) == 2
+    @pytest.mark.asyncio
+    async def test_reuses_auth_state_from_pre_spawn_start(self, hooks):
+        """Test that auth state handed over by the authenticator is used once and then dropped."""
+        spawner = Mock()
+        spawner.user.get_auth_state = AsyncMock(return_value={"kbase_token": "fresh-token"})
+        setattr(spawner, hooks.AUTH_STATE_SPAWNER_ATTR, {"kbase_token": "cached-token"})
 
-    def test_modify_pod_hook_invalid_toleration_format(self):
-        """Test handling of invalid toleration formats."""
-        # Setup
+        assert await hooks._get_auth_token(spawner) == "cached-token"
+        spawner.user.get_auth_state.assert_not_awaited()
+
+        assert await hooks._get_auth_token(spawner) == "fresh-token"
+        spawner.user.get_auth_state.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_post_stop_hook_drops_unused_auth_state(self, hooks):
+        """Test that auth state handed over for a spawn that never reached pre_spawn_hook is dropped on stop."""
         spawner = Mock()
-        spawner.log = Mock()
+        spawner.user.get_auth_state = AsyncMock(return_value={"kbase_token": "fresh-token"})
+        setattr(spawner, hooks.AUTH_STATE_SPAWNER_ATTR, {"kbase_token": "cached-token"})
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+        with patch.object(hooks, "_SKIP_SPAWN_HOOKS", True):
+            await hooks.post_stop_hook(spawner)
 
-        # Set environment variable with invalid format
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": "invalid_format,environments=dev:NoSchedule"}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
+        assert hooks.AUTH_STATE_SPAWNER_ATTR not in vars(spawner)
 
-            # Verify warning is logged for invalid format
-            spawner.log.warning.assert_called_once()
-            warning_call = spawner.log.warning.call_args
-            assert "Invalid toleration format" in warning_call[0][0]
-            assert "invalid_format" in warning_call[0][0]
 
-            # Verify valid toleration is still added
-            assert hasattr(result.spec, "tolerations")
-            assert len(result.spec.tolerations) == 1
-            assert result.spec.tolerations[0].value == "dev"
+class TestPostStopHook:
+    """Test suite for the background teardown scheduled by post_stop_hook."""
 
-    def test_modify_pod_hook_all_invalid_tolerations(self):
-        """Test handling when all tolerations are invalid."""
-        # Setup
+    @pytest.fixture
+    def spawner(self):
         spawner = Mock()
-        spawner.log = Mock()
+        spawner.user.name = "testuser"
+        spawner.user.get_auth_state = AsyncMock(return_value={"kbase_token": "test-token"})
+        spawner.profile_list = []
+        spawner.environment = {}
+        return spawner
+
+    @pytest.mark.asyncio
+    async def test_post_stop_hook_tears_down_in_background(self, spawner, hooks):
+        """Test that teardown runs after the hook returns and is awaited by the next spawn."""
+        released = asyncio.Event()
+
+        async def stop_spark_cluster(_):
+            await released.wait()
+
+        manager = Mock()
+        manager.stop_spark_cluster = AsyncMock(side_effect=stop_spark_cluster)
+        manager.aclose = AsyncMock()
+        manager.start_spark_cluster = AsyncMock()
+
+        with (
+            patch.object(hooks, "_SKIP_SPAWN_HOOKS", False),
+            patch.object(hooks, "SparkClusterManager", return_value=manager),
+            patch.object(hooks, "delete_user_notebook_service") as mock_delete,
+            patch.object(hooks, "create_user_notebook_service"),
+        ):
+            await hooks.post_stop_hook(spawner)
+            assert "testuser" in hooks._teardown_tasks
+            mock_delete.assert_not_called()
+
+            spawn = asyncio.create_task(hooks.pre_spawn_hook(spawner))
+            await asyncio.sleep(0.01)
+            manager.stop_spark_cluster.assert_awaited_once()
+            manager.start_spark_cluster.assert_not_called()
+
+            released.set()
+            await spawn
+
+        mock_delete.assert_called_once_with(spawner)
+        manager.start_spark_cluster.assert_awaited_once_with(spawner)
+        assert "testuser" not in hooks._teardown_tasks
+
+    @pytest.mark.asyncio
+    async def test_shutdown_finishes_pending_teardowns(self, spawner, hooks):
+        """Test that teardowns cancelled by hub shutdown, in flight or queued, still delete the resources."""
+        released = asyncio.Event()
+
+        async def stop_spark_cluster(_):
+            await released.wait()
+
+        manager = Mock()
+        manager.stop_spark_cluster = AsyncMock(side_effect=stop_spark_cluster)
+        manager.aclose = AsyncMock()
+        other_spawner = Mock(profile_list=[], environment={})
+        other_spawner.user.name = "otheruser"
+        other_spawner.user.get_auth_state = AsyncMock(return_value={"kbase_token": "other-token"})
+
+        with (
+            patch.object(hooks, "_SKIP_SPAWN_HOOKS", False),
+            patch.object(hooks, "_TEARDOWN_SEMAPHORE", asyncio.Semaphore(1)),
+            patch.object(hooks, "SparkClusterManager", return_value=manager),
+            patch.object(hooks, "delete_user_notebook_service") as mock_delete,
+        ):
+            await hooks.post_stop_hook(spawner)
+            await hooks.post_stop_hook(other_spawner)
+            tasks = [hooks._teardown_tasks["testuser"], hooks._teardown_tasks["otheruser"]]
+            await asyncio.sleep(0.01)
+            # The first teardown is deleting the cluster, the second is queued behind it
+            manager.stop_spark_cluster.assert_awaited_once_with(spawner)
+
+            # What the hub does on shutdown once every server is stopped: cancel every other task
+            pending = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in pending:
+                task.cancel()
+            released.set()
+            await asyncio.wait(pending)
+
+        assert all(task.cancelled() for task in tasks)
+        # The hub cancels tasks in no particular order, so either teardown may finish first
+        assert sorted(c.args[0].user.name for c in mock_delete.call_args_list) == ["otheruser", "testuser"]
+        # Only the interrupted cluster deletion is sent again
+        assert sorted(c.args[0].user.name for c in manager.stop_spark_cluster.await_args_list) == [
+            "otheruser",
+            "testuser",
+            "testuser",
+        ]
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+    @pytest.mark.asyncio
+    async def test_shutdown_does_not_repeat_finished_steps(self, spawner, hooks):
+        """Test that a teardown cancelled after deleting the cluster does not delete it again."""
+        manager = Mock()
+        manager.stop_spark_cluster = AsyncMock()
+        manager.aclose = AsyncMock()
+        service_created = asyncio.get_running_loop().create_future()
+
+        with (
+            patch.object(hooks, "_SKIP_SPAWN_HOOKS", False),
+            patch.object(hooks, "SparkClusterManager", return_value=manager),
+            patch.object(hooks, "delete_user_notebook_service") as mock_delete,
+            patch.dict(hooks._service_tasks, {"testuser": service_created}),
+        ):
+            await hooks.post_stop_hook(spawner)
+            task = hooks._teardown_tasks["testuser"]
+            await asyncio.sleep(0.01)
+            manager.stop_spark_cluster.assert_awaited_once()
+
+            pending = asyncio.all_tasks() - {asyncio.current_task()}
+            for pending_task in pending:
+                pending_task.cancel()
+            service_created.set_result(None)
+            await asyncio.wait(pending)
+
+        assert task.cancelled()
+        manager.stop_spark_cluster.assert_awaited_once()
+        mock_delete.assert_called_once_with(spawner)
+
+    @pytest.mark.asyncio
+    async def test_pre_spawn_hook_creates_service_in_background(self, spawner, hooks):
+        """Test that the spawn does not wait for the Spark Connect Service to be created."""
+        created = threading.Event()
+        manager = Mock()
+        manager.start_spark_cluster = AsyncMock()
+        manager.aclose = AsyncMock()
+
+        with (
+            patch.object(hooks, "_SKIP_SPAWN_HOOKS", False),
+            patch.object(hooks, "SparkClusterManager", return_value=manager),
+            patch.object(hooks, "create_user_notebook_service", side_effect=lambda _: created.wait(5)),
+        ):
+            await hooks.pre_spawn_hook(spawner)
+            service_task = hooks._service_tasks["testuser"]
+            assert not service_task.done()
+            manager.start_spark_cluster.assert_awaited_once_with(spawner)
+
+            created.set()
+            await service_task
+
+        assert "testuser" not in hooks._service_tasks
+
+    @pytest.mark.asyncio
+    async def test_teardown_errors_are_logged(self, spawner, hooks):
+        """Test that teardown failures are logged rather than raised."""
+        manager = Mock()
+        manager.stop_spark_cluster = AsyncMock(side_effect=RuntimeError("boom"))
+        manager.aclose = AsyncMock()
+
+        with patch.object(hooks, "SparkClusterManager", return_value=manager):
+            await hooks._teardown_user_resources("test-token", spawner)
+
+        spawner.log.exception.assert_called_once()
+        manager.aclose.assert_awaited_once()
 
-        # Set environment variable with all invalid formats
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": "invalid1,invalid2"}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
 
-            # Verify warnings are logged
-            assert spawner.log.warning.call_count == 2
+class TestModifyPodHook:
+    """Test suite for modify_pod_hook function."""
 
-            # Verify no tolerations are added (tolerations should not be a list)
-            assert not isinstance(result.spec.tolerations, list)
+    @pytest.fixture
+    def pod_and_spawner(self):
+        return _make_pod(), _make_spawner()
 
-    def test_modify_pod_hook_different_effects(self):
-        """Test tolerations with different effects."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
+    def test_modify_pod_hook_basic_env_vars(self, hooks, pod_and_spawner):
+        """Test that basic environment variables are added to the pod."""
+        pod, spawner = pod_and_spawner
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+        # Execute
+        result = hooks.modify_pod_hook(spawner, pod)
 
-        # Set environment variable with different effects
-        tolerations_str = "tier=frontend:NoExecute,zone=us-west:PreferNoSchedule"
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": tolerations_str}):
-            # Execute
-            result = modify_pod_hook(spawner, pod)
+        # Verify basic environment variables are added
+        env = _env_map(result)
+        assert EXPECTED_POD_ENV_VARS <= env.keys(), EXPECTED_POD_ENV_VARS - env.keys()
 
-            # Verify tolerations with different effects
-            assert hasattr(result.spec, "tolerations")
-            assert len(result.spec.tolerations) == 2
+        # Verify pod is returned
+        assert result == pod
 
-            effects = [t.effect for t in result.spec.tolerations]
-            assert "NoExecute" in effects
-            assert "PreferNoSchedule" in effects
+    def test_modify_pod_hook_no_tolerations(self, hooks, pod_and_spawner):
+        """Test that no tolerations are added when BERDL_TOLERATIONS is not set."""
+        pod, spawner = pod_and_spawner
 
-    def test_modify_pod_hook_kubernetes_client_call(self):
-        """Test that Kubernetes client V1Toleration is called correctly."""
-        # Setup
-        spawner = Mock()
-        spawner.log = Mock()
+        # No tolerations configured
+        with _tolerations(hooks, ""):
+            # Execute
+            result = hooks.modify_pod_hook(spawner, pod)
 
-        pod = Mock()
-        pod.spec = Mock()
-        pod.spec.containers = [Mock()]
-        pod.spec.containers[0].env = []
+            # Verify tolerations are not set on the spec
+            assert not hasattr(result.spec, "tolerations")
+
+    @pytest.mark.parametrize(
+        "tolerations_env,expected",
+        [
+            ("environments=dev:NoSchedule", [("environments", "Equal", "dev", "NoSchedule")]),
+            (
+                "environments=dev:NoSchedule,environments=prod:NoSchedule",
+                [("environments", "Equal", "dev", "NoSchedule"), ("environments", "Equal", "prod", "NoSchedule")],
+            ),
+            (
+                " environments=dev:NoSchedule , environments=prod:NoSchedule ",
+                [("environments", "Equal", "dev", "NoSchedule"), ("environments", "Equal", "prod", "NoSchedule")],
+            ),
+            (
+                "tier=frontend:NoExecute,zone=us-west:PreferNoSchedule",
+                [("tier", "Equal", "frontend", "NoExecute"), ("zone", "Equal", "us-west", "PreferNoSchedule")],
+            ),
+        ],
+        ids=["single", "multiple", "with_spaces", "different_effects"],
+    )
+    def test_modify_pod_hook_tolerations(self, hooks, pod_and_spawner, tolerations_env, expected):
+        """Test that configured tolerations are parsed into V1Tolerations on the pod spec."""
+        pod, spawner = pod_and_spawner
+        with _tolerations(hooks, tolerations_env):
+            result = hooks.modify_pod_hook(spawner, pod)
+
+        assert isinstance(result.spec.tolerations, list)
+        assert [(t.key, t.operator, t.value, t.effect) for t in result.spec.tolerations] == expected
+
+    def test_modify_pod_hook_invalid_toleration_format(self, hooks, pod_and_spawner):
+        """Test handling of invalid toleration formats."""
+        pod, spawner = pod_and_spawner
 
-        # Set environment variable
-        with patch.dict(os.environ, {"BERDL_TOLERATIONS": "environments=dev:NoSchedule"}):
+        # Set environment variable with invalid format
+        with _tolerations(hooks, "invalid_format,environments=dev:NoSchedule", spawner.log):
             # Execute
-            result = modify_pod_hook(spawner, pod)
+            result = hooks.modify_pod_hook(spawner, pod)
 
-            # Verify toleration was added correctly
-            assert isinstance(result.spec.tolerations, list)
+            # Verify warning is logged for invalid format
+            assert len(spawner.log.warning.calls) == 1
+            msg, *args = spawner.log.warning.calls[0][0]
+            assert "Invalid toleration format" in msg
+            assert "invalid_format" in msg % tuple(args)
+
+            # Verify valid toleration is still added
+            assert hasattr(result.spec, "tolerations")
             assert len(result.spec.tolerations) == 1
+            assert result.spec.tolerations[0].value == "dev"
+
+    def test_modify_pod_hook_all_invalid_tolerations(self, hooks, pod_and_spawner):
+        """Test handling when all tolerations are invalid."""
+        pod, spawner = pod_and_spawner
+
+        # Set environment variable with all invalid formats
+        with _tolerations(hooks, "invalid1,invalid2", spawner.log):
+            # Execute
+            result = hooks.modify_pod_hook(spawner, pod)
+
+            # Verify warnings are logged
+            assert len(spawner.log.warning.calls) == 2
 
-            toleration = result.spec.tolerations[0]
-            assert toleration.key == "environments"
-            assert toleration.operator == "Equal"
-            assert toleration.value == "dev"
-            assert toleration.effect == "NoSchedule"
+            # Verify no tolerations are added
+            assert not hasattr(result.spec, "tolerations")